@@ -1,11 +1,10 @@
 import backtrader as bt
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from collections import deque
+from market_structure import MarketStructure
+from zones import SUPPORT, RESISTANCE, ZONE_NAMES
 
 
-class SMCICTStrategy(bt.Strategy):
+class SMCICTStrategy(MarketStructure, bt.Strategy):
     """
     Smart Money Concepts (SMC) / Inner Circle Trader (ICT) Strategy
     
@@ -30,6 +29,7 @@ class SMCICTStrategy(bt.Strategy):
         ('fvg_min_size', 5),      # Minimum FVG size in points
         ('ote_fib_low', 0.618),   # OTE Fibonacci low level
         ('ote_fib_high', 0.79),   # OTE Fibonacci high level
+        ('verbose', False),       # Log structure/trade events (printed in stop())
     )
     
     def __init__(self):
@@ -42,25 +42,31 @@ class SMCICTStrategy(bt.Strategy):
         # ATR for dynamic stop loss
         self.atr = bt.indicators.ATR(self.data_15m, period=14)
         
+        # Run constants, cached as plain floats to skip params lookups per bar
+        self._risk = float(self.p.risk_per_trade)
+        self._atr_mult = float(self.p.atr_multiplier)
+        self._rr = float(self.p.target_rr)
+        self._trail = float(self.p.trail_after_rr)
+        self._max_trades = self.p.max_trades_per_day
+        self._verbose = bool(self.p.verbose)
+        
         # Track daily bias
         self.daily_bias = 0  # 1 = bullish, -1 = bearish, 0 = neutral
         
-        # Structure tracking
-        self.swing_highs = deque(maxlen=self.params.lookback_period)
-        self.swing_lows = deque(maxlen=self.params.lookback_period)
-        self.last_bos_direction = 0  # 1 = bullish BoS, -1 = bearish BoS
-        
-        # Liquidity zones
-        self.liquidity_zones = []  # List of liquidity zones
-        
-        # Fair Value Gaps
-        self.fvgs = []  # List of active FVGs
-        
-        # Order Blocks
-        self.order_blocks = []  # List of active order blocks
-        
-        # Breaker Blocks
-        self.breaker_blocks = []  # List of active breaker blocks
+        # Structure, liquidity, FVG, OB and breaker state (see MarketStructure)
+        self.init_structure()
+        
+        # Raw 15-minute line arrays, indexed by absolute bar number. Reading
+        # them directly bypasses Backtrader's LineBuffer __getitem__ and its
+        # relative (0, -1, ...) index translation, so it relies on the feed
+        # keeping every bar in memory (the default; not exactbars >= 1).
+        lines = self.data_15m.lines
+        self._O = lines.open.array
+        self._H = lines.high.array
+        self._L = lines.low.array
+        self._C = lines.close.array
+        self._DT = lines.datetime.array
+        self._bar_i = -1  # Absolute index of the current 15-minute bar
         
         # Trade management
         self.trades_today = 0
@@ -71,6 +77,9 @@ class SMCICTStrategy(bt.Strategy):
         self.position_size = 0
         self.trail_activated = False
         
+        # Buffered log messages, printed once in stop() (see log())
+        self._log_buf = []
+        
         # Performance tracking
         self.total_trades = 0
         self.winning_trades = 0
@@ -80,14 +89,43 @@ class SMCICTStrategy(bt.Strategy):
         
         self.log("SMC/ICT Strategy initialized for NAS100 15m timeframe")
     
-    def log(self, txt, dt=None):
-        """Logging function with timestamp"""
+    def start(self):
+        """Precompute pattern signals over the preloaded 15-minute data"""
+        self.precompute_signals()
+    
+    def log(self, txt, *args, dt=None):
+        """
+        Buffer a log message when the verbose parameter is set
+        
+        Formatting (``txt % args``) and printing are deferred to flush_log(),
+        so a disabled log call costs one attribute check.
+        
+        Args:
+            txt (str): Message, optionally with %-style placeholders
+            *args: Values for the placeholders
+            dt (date): Timestamp to print instead of the current bar's date
+        """
+        if not self._verbose:
+            return
+        self._log_buf.append((dt, self.datas[0].datetime[0], txt, args))
+    
+    def flush_log(self):
+        """Print and clear the buffered log messages"""
+        for dt, bar_dt, txt, args in self._log_buf:
+            self.print_log(txt % args if args else txt,
+                           dt or self.datas[0].num2date(bar_dt).date())
+        self._log_buf.clear()
+    
+    def print_log(self, txt, dt=None):
+        """Print a message immediately with timestamp"""
         dt = dt or self.datas[0].datetime.date(0)
         print(f'{dt.isoformat()} {txt}')
     
     def next(self):
         """Main strategy logic executed on each bar"""
         
+        self._bar_i = len(self.data_15m) - 1
+        
         # Reset daily trade counter
         current_date = self.data_15m.datetime.date(0)
         if self.current_date != current_date:
@@ -95,21 +133,18 @@ class SMCICTStrategy(bt.Strategy):
             self.trades_today = 0
         
         # Skip if max trades per day reached
-        if self.trades_today >= self.params.max_trades_per_day:
+        if self.trades_today >= self._max_trades:
             return
         
+        # Data that was not preloaded grows bar by bar: refresh the signals
+        if self._bar_i >= self._signals_len:
+            self.precompute_signals()
+        
         # Update daily bias
         self.update_daily_bias()
         
         # Update market structure
-        self.update_swing_points()
-        self.update_liquidity_zones()
-        self.update_fvgs()
-        self.update_order_blocks()
-        self.update_breaker_blocks()
-        
-        # Check for Break of Structure
-        self.check_break_of_structure()
+        self.update_structure()
         
         # Manage existing positions
         if self.position:
@@ -133,271 +168,12 @@ class SMCICTStrategy(bt.Strategy):
                 # Keep previous bias if no clear signal
                 pass
     
-    def update_swing_points(self):
-        """Identify and update swing highs and lows"""
-        if len(self.data_15m) < 5:
-            return
-        
-        # Check for swing high (current high > 2 previous and 2 next highs)
-        if (len(self.data_15m) >= 5 and
-            self.data_15m.high[-2] > self.data_15m.high[-4] and
-            self.data_15m.high[-2] > self.data_15m.high[-3] and
-            self.data_15m.high[-2] > self.data_15m.high[-1] and
-            self.data_15m.high[-2] > self.data_15m.high[0]):
-            
-            swing_high = {
-                'price': self.data_15m.high[-2],
-                'index': len(self.data_15m) - 2,
-                'datetime': self.data_15m.datetime[-2]
-            }
-            self.swing_highs.append(swing_high)
-        
-        # Check for swing low
-        if (len(self.data_15m) >= 5 and
-            self.data_15m.low[-2] < self.data_15m.low[-4] and
-            self.data_15m.low[-2] < self.data_15m.low[-3] and
-            self.data_15m.low[-2] < self.data_15m.low[-1] and
-            self.data_15m.low[-2] < self.data_15m.low[0]):
-            
-            swing_low = {
-                'price': self.data_15m.low[-2],
-                'index': len(self.data_15m) - 2,
-                'datetime': self.data_15m.datetime[-2]
-            }
-            self.swing_lows.append(swing_low)
-    
-    def update_liquidity_zones(self):
-        """Identify liquidity zones (equal highs/lows)"""
-        # Clean old liquidity zones
-        self.liquidity_zones = [zone for zone in self.liquidity_zones 
-                               if not zone.get('swept', False)]
-        
-        # Check for equal highs
-        if len(self.swing_highs) >= self.params.liquidity_touches:
-            recent_highs = list(self.swing_highs)[-10:]  # Last 10 swing highs
-            for i, high1 in enumerate(recent_highs[:-1]):
-                touches = 1
-                for high2 in recent_highs[i+1:]:
-                    if abs(high1['price'] - high2['price']) <= 10:  # Within 10 points
-                        touches += 1
-                
-                if touches >= self.params.liquidity_touches:
-                    liquidity_zone = {
-                        'type': 'resistance',
-                        'price': high1['price'],
-                        'touches': touches,
-                        'swept': False
-                    }
-                    
-                    # Check if already exists
-                    exists = any(abs(zone['price'] - liquidity_zone['price']) <= 10 
-                               for zone in self.liquidity_zones 
-                               if zone['type'] == 'resistance')
-                    
-                    if not exists:
-                        self.liquidity_zones.append(liquidity_zone)
-        
-        # Check for equal lows
-        if len(self.swing_lows) >= self.params.liquidity_touches:
-            recent_lows = list(self.swing_lows)[-10:]  # Last 10 swing lows
-            for i, low1 in enumerate(recent_lows[:-1]):
-                touches = 1
-                for low2 in recent_lows[i+1:]:
-                    if abs(low1['price'] - low2['price']) <= 10:  # Within 10 points
-                        touches += 1
-                
-                if touches >= self.params.liquidity_touches:
-                    liquidity_zone = {
-                        'type': 'support',
-                        'price': low1['price'],
-                        'touches': touches,
-                        'swept': False
-                    }
-                    
-                    # Check if already exists
-                    exists = any(abs(zone['price'] - liquidity_zone['price']) <= 10 
-                               for zone in self.liquidity_zones 
-                               if zone['type'] == 'support')
-                    
-                    if not exists:
-                        self.liquidity_zones.append(liquidity_zone)
-        
-        # Check for liquidity grabs
-        current_high = self.data_15m.high[0]
-        current_low = self.data_15m.low[0]
-        current_close = self.data_15m.close[0]
-        
-        for zone in self.liquidity_zones:
-            if zone['type'] == 'resistance' and not zone['swept']:
-                if current_high > zone['price'] and current_close < zone['price']:
-                    zone['swept'] = True
-                    self.log(f"Liquidity grab above resistance at {zone['price']}")
-            
-            elif zone['type'] == 'support' and not zone['swept']:
-                if current_low < zone['price'] and current_close > zone['price']:
-                    zone['swept'] = True
-                    self.log(f"Liquidity grab below support at {zone['price']}")
-    
-    def update_fvgs(self):
-        """Identify Fair Value Gaps"""
-        if len(self.data_15m) < 3:
-            return
-        
-        # Clean filled FVGs
-        current_high = self.data_15m.high[0]
-        current_low = self.data_15m.low[0]
-        
-        self.fvgs = [fvg for fvg in self.fvgs 
-                    if not self.is_fvg_filled(fvg, current_high, current_low)]
-        
-        # Check for new bullish FVG
-        if (self.data_15m.low[0] > self.data_15m.high[-2] and
-            self.data_15m.low[0] - self.data_15m.high[-2] >= self.params.fvg_min_size):
-            
-            fvg = {
-                'type': 'bullish',
-                'top': self.data_15m.low[0],
-                'bottom': self.data_15m.high[-2],
-                'index': len(self.data_15m),
-                'filled': False
-            }
-            self.fvgs.append(fvg)
-            self.log(f"Bullish FVG identified: {fvg['bottom']:.2f} - {fvg['top']:.2f}")
-        
-        # Check for new bearish FVG
-        if (self.data_15m.high[0] < self.data_15m.low[-2] and
-            self.data_15m.low[-2] - self.data_15m.high[0] >= self.params.fvg_min_size):
-            
-            fvg = {
-                'type': 'bearish',
-                'top': self.data_15m.low[-2],
-                'bottom': self.data_15m.high[0],
-                'index': len(self.data_15m),
-                'filled': False
-            }
-            self.fvgs.append(fvg)
-            self.log(f"Bearish FVG identified: {fvg['bottom']:.2f} - {fvg['top']:.2f}")
-    
-    def is_fvg_filled(self, fvg, current_high, current_low):
-        """Check if FVG is filled"""
-        if fvg['type'] == 'bullish':
-            return current_low <= fvg['bottom']
-        else:  # bearish
-            return current_high >= fvg['top']
-    
-    def update_order_blocks(self):
-        """Identify Order Blocks"""
-        if len(self.data_15m) < 10:
-            return
-        
-        # Clean old order blocks (keep only recent ones)
-        self.order_blocks = self.order_blocks[-20:]  # Keep last 20
-        
-        # Look for bullish order block (last up candle before down move)
-        for i in range(5, len(self.data_15m)):
-            if (self.data_15m.close[-i] > self.data_15m.open[-i] and  # Up candle
-                self.data_15m.close[-i+1] < self.data_15m.open[-i+1] and  # Next candle down
-                self.data_15m.close[-i+2] < self.data_15m.close[-i+1]):  # Continued down move
-                
-                ob = {
-                    'type': 'bullish',
-                    'top': self.data_15m.high[-i],
-                    'bottom': self.data_15m.low[-i],
-                    'index': len(self.data_15m) - i,
-                    'invalidated': False
-                }
-                
-                # Check if already exists
-                exists = any(abs(existing_ob['top'] - ob['top']) <= 5 and
-                           abs(existing_ob['bottom'] - ob['bottom']) <= 5
-                           for existing_ob in self.order_blocks
-                           if existing_ob['type'] == 'bullish')
-                
-                if not exists:
-                    self.order_blocks.append(ob)
-                    self.log(f"Bullish Order Block: {ob['bottom']:.2f} - {ob['top']:.2f}")
-                break
-        
-        # Look for bearish order block (last down candle before up move)
-        for i in range(5, len(self.data_15m)):
-            if (self.data_15m.close[-i] < self.data_15m.open[-i] and  # Down candle
-                self.data_15m.close[-i+1] > self.data_15m.open[-i+1] and  # Next candle up
-                self.data_15m.close[-i+2] > self.data_15m.close[-i+1]):  # Continued up move
-                
-                ob = {
-                    'type': 'bearish',
-                    'top': self.data_15m.high[-i],
-                    'bottom': self.data_15m.low[-i],
-                    'index': len(self.data_15m) - i,
-                    'invalidated': False
-                }
-                
-                # Check if already exists
-                exists = any(abs(existing_ob['top'] - ob['top']) <= 5 and
-                           abs(existing_ob['bottom'] - ob['bottom']) <= 5
-                           for existing_ob in self.order_blocks
-                           if existing_ob['type'] == 'bearish')
-                
-                if not exists:
-                    self.order_blocks.append(ob)
-                    self.log(f"Bearish Order Block: {ob['bottom']:.2f} - {ob['top']:.2f}")
-                break
-        
-        # Check for order block invalidation
-        current_close = self.data_15m.close[0]
-        for ob in self.order_blocks:
-            if not ob['invalidated']:
-                if ob['type'] == 'bullish' and current_close < ob['bottom']:
-                    ob['invalidated'] = True
-                elif ob['type'] == 'bearish' and current_close > ob['top']:
-                    ob['invalidated'] = True
-    
-    def update_breaker_blocks(self):
-        """Identify Breaker Blocks (invalidated order blocks that become resistance/support)"""
-        for ob in self.order_blocks:
-            if ob['invalidated']:
-                # Convert to breaker block
-                breaker = {
-                    'type': 'bearish' if ob['type'] == 'bullish' else 'bullish',
-                    'top': ob['top'],
-                    'bottom': ob['bottom'],
-                    'original_type': ob['type']
-                }
-                
-                # Check if already exists
-                exists = any(abs(bb['top'] - breaker['top']) <= 5 and
-                           abs(bb['bottom'] - breaker['bottom']) <= 5
-                           for bb in self.breaker_blocks)
-                
-                if not exists:
-                    self.breaker_blocks.append(breaker)
-                    self.log(f"Breaker Block formed: {breaker['type']} at {breaker['bottom']:.2f} - {breaker['top']:.2f}")
-    
-    def check_break_of_structure(self):
-        """Check for Break of Structure"""
-        if not self.swing_highs or not self.swing_lows:
-            return
-        
-        current_close = self.data_15m.close[0]
-        last_swing_high = max(self.swing_highs, key=lambda x: x['index'])['price']
-        last_swing_low = min(self.swing_lows, key=lambda x: x['index'])['price']
-        
-        # Bullish BoS
-        if current_close > last_swing_high and self.last_bos_direction != 1:
-            self.last_bos_direction = 1
-            self.log(f"Bullish Break of Structure at {current_close:.2f}")
-        
-        # Bearish BoS
-        elif current_close < last_swing_low and self.last_bos_direction != -1:
-            self.last_bos_direction = -1
-            self.log(f"Bearish Break of Structure at {current_close:.2f}")
-    
     def check_entry_conditions(self):
         """Check for trade entry conditions"""
         if not self.swing_highs or not self.swing_lows:
             return
         
-        current_price = self.data_15m.close[0]
+        current_price = self._C[self._bar_i]
         
         # Check for long entry
         if self.daily_bias == 1:  # Bullish bias
@@ -409,112 +185,30 @@ class SMCICTStrategy(bt.Strategy):
             if self.check_short_conditions(current_price):
                 self.enter_short()
     
-    def check_long_conditions(self, current_price):
-        """Check conditions for long entry"""
-        # 1. Liquidity grab below recent swing low
-        liquidity_grabbed = any(zone['type'] == 'support' and zone['swept'] 
-                               for zone in self.liquidity_zones)
-        
-        # 2. Price in bullish FVG
-        in_bullish_fvg = any(fvg['type'] == 'bullish' and 
-                            fvg['bottom'] <= current_price <= fvg['top']
-                            for fvg in self.fvgs)
-        
-        # 3. Bullish order block support
-        ob_support = any(ob['type'] == 'bullish' and not ob['invalidated'] and
-                        ob['bottom'] <= current_price <= ob['top']
-                        for ob in self.order_blocks)
-        
-        # 4. Bullish BoS
-        bullish_bos = self.last_bos_direction == 1
-        
-        # 5. OTE zone (61.8% - 79% retracement)
-        in_ote_zone = self.check_ote_zone(current_price, 'bullish')
-        
-        return (liquidity_grabbed and in_bullish_fvg and 
-                ob_support and bullish_bos and in_ote_zone)
-    
-    def check_short_conditions(self, current_price):
-        """Check conditions for short entry"""
-        # 1. Liquidity grab above recent swing high
-        liquidity_grabbed = any(zone['type'] == 'resistance' and zone['swept'] 
-                               for zone in self.liquidity_zones)
-        
-        # 2. Price in bearish FVG
-        in_bearish_fvg = any(fvg['type'] == 'bearish' and 
-                            fvg['bottom'] <= current_price <= fvg['top']
-                            for fvg in self.fvgs)
-        
-        # 3. Bearish order block resistance
-        ob_resistance = any(ob['type'] == 'bearish' and not ob['invalidated'] and
-                           ob['bottom'] <= current_price <= ob['top']
-                           for ob in self.order_blocks)
-        
-        # 4. Bearish BoS
-        bearish_bos = self.last_bos_direction == -1
-        
-        # 5. OTE zone (61.8% - 79% retracement)
-        in_ote_zone = self.check_ote_zone(current_price, 'bearish')
-        
-        return (liquidity_grabbed and in_bearish_fvg and 
-                ob_resistance and bearish_bos and in_ote_zone)
-    
-    def check_ote_zone(self, current_price, direction):
-        """Check if price is in Optimal Trade Entry zone"""
-        if not self.swing_highs or not self.swing_lows:
-            return False
-        
-        if direction == 'bullish':
-            # Get recent swing low to high
-            recent_low = min(self.swing_lows, key=lambda x: x['index'])['price']
-            recent_high = max(self.swing_highs, key=lambda x: x['index'])['price']
-            
-            if recent_high > recent_low:
-                range_size = recent_high - recent_low
-                fib_618 = recent_high - (range_size * self.params.ote_fib_low)
-                fib_79 = recent_high - (range_size * self.params.ote_fib_high)
-                
-                return fib_79 <= current_price <= fib_618
-        
-        else:  # bearish
-            # Get recent swing high to low
-            recent_high = max(self.swing_highs, key=lambda x: x['index'])['price']
-            recent_low = min(self.swing_lows, key=lambda x: x['index'])['price']
-            
-            if recent_high > recent_low:
-                range_size = recent_high - recent_low
-                fib_618 = recent_low + (range_size * self.params.ote_fib_low)
-                fib_79 = recent_low + (range_size * self.params.ote_fib_high)
-                
-                return fib_618 <= current_price <= fib_79
-        
-        return False
-    
     def enter_long(self):
         """Enter long position"""
         if self.position:
             return
         
-        current_price = self.data_15m.close[0]
+        current_price = self._C[self._bar_i]
         atr_value = self.atr[0]
         
         # Calculate stop loss (below liquidity grab)
-        liquidity_zones_support = [zone for zone in self.liquidity_zones 
-                                  if zone['type'] == 'support' and zone['swept']]
-        if liquidity_zones_support:
-            stop_loss = min(zone['price'] for zone in liquidity_zones_support) - (atr_value * self.params.atr_multiplier)
+        swept_support = self.swept_liquidity_price(SUPPORT)
+        if swept_support is not None:
+            stop_loss = swept_support - (atr_value * self._atr_mult)
         else:
-            stop_loss = current_price - (atr_value * self.params.atr_multiplier)
+            stop_loss = current_price - (atr_value * self._atr_mult)
         
         # Calculate position size based on fixed risk
         risk_per_point = abs(current_price - stop_loss)
         if risk_per_point > 0:
-            position_size = self.params.risk_per_trade / risk_per_point
+            position_size = self._risk / risk_per_point
         else:
             return
         
         # Calculate take profit (1:3 RR)
-        take_profit = current_price + (abs(current_price - stop_loss) * self.params.target_rr)
+        take_profit = current_price + (abs(current_price - stop_loss) * self._rr)
         
         # Place order
         self.order = self.buy(size=position_size)
@@ -525,34 +219,33 @@ class SMCICTStrategy(bt.Strategy):
         self.trail_activated = False
         self.trades_today += 1
         
-        self.log(f"LONG ENTRY: Price={current_price:.2f}, Size={position_size:.2f}, "
-                f"SL={stop_loss:.2f}, TP={take_profit:.2f}")
+        self.log('LONG ENTRY: Price=%.2f, Size=%.2f, SL=%.2f, TP=%.2f',
+                 current_price, position_size, stop_loss, take_profit)
     
     def enter_short(self):
         """Enter short position"""
         if self.position:
             return
         
-        current_price = self.data_15m.close[0]
+        current_price = self._C[self._bar_i]
         atr_value = self.atr[0]
         
         # Calculate stop loss (above liquidity grab)
-        liquidity_zones_resistance = [zone for zone in self.liquidity_zones 
-                                     if zone['type'] == 'resistance' and zone['swept']]
-        if liquidity_zones_resistance:
-            stop_loss = max(zone['price'] for zone in liquidity_zones_resistance) + (atr_value * self.params.atr_multiplier)
+        swept_resistance = self.swept_liquidity_price(RESISTANCE)
+        if swept_resistance is not None:
+            stop_loss = swept_resistance + (atr_value * self._atr_mult)
         else:
-            stop_loss = current_price + (atr_value * self.params.atr_multiplier)
+            stop_loss = current_price + (atr_value * self._atr_mult)
         
         # Calculate position size based on fixed risk
         risk_per_point = abs(stop_loss - current_price)
         if risk_per_point > 0:
-            position_size = self.params.risk_per_trade / risk_per_point
+            position_size = self._risk / risk_per_point
         else:
             return
         
         # Calculate take profit (1:3 RR)
-        take_profit = current_price - (abs(stop_loss - current_price) * self.params.target_rr)
+        take_profit = current_price - (abs(stop_loss - current_price) * self._rr)
         
         # Place order
         self.order = self.sell(size=position_size)
@@ -563,87 +256,74 @@ class SMCICTStrategy(bt.Strategy):
         self.trail_activated = False
         self.trades_today += 1
         
-        self.log(f"SHORT ENTRY: Price={current_price:.2f}, Size={position_size:.2f}, "
-                f"SL={stop_loss:.2f}, TP={take_profit:.2f}")
+        self.log('SHORT ENTRY: Price=%.2f, Size=%.2f, SL=%.2f, TP=%.2f',
+                 current_price, position_size, stop_loss, take_profit)
     
     def manage_position(self):
         """Manage existing position"""
         if not self.position:
             return
         
-        current_price = self.data_15m.close[0]
+        current_price = self._C[self._bar_i]
         
         # Check for stop loss
         if self.position.size > 0:  # Long position
             if current_price <= self.stop_loss:
                 self.close()
-                self.log(f"STOP LOSS HIT: Price={current_price:.2f}")
+                self.log('STOP LOSS HIT: Price=%.2f', current_price)
                 return
             
             # Check for take profit
             if current_price >= self.take_profit:
                 self.close()
-                self.log(f"TAKE PROFIT HIT: Price={current_price:.2f}")
+                self.log('TAKE PROFIT HIT: Price=%.2f', current_price)
                 return
             
             # Trail stop after 2R
             if not self.trail_activated:
                 profit = current_price - self.entry_price
                 risk = self.entry_price - self.stop_loss
-                if profit >= (risk * self.params.trail_after_rr):
+                if profit >= (risk * self._trail):
                     self.stop_loss = self.entry_price  # Move to breakeven
                     self.trail_activated = True
-                    self.log(f"TRAILING STOP ACTIVATED: Moved SL to breakeven at {self.stop_loss:.2f}")
+                    self.log('TRAILING STOP ACTIVATED: Moved SL to breakeven at %.2f', self.stop_loss)
         
         else:  # Short position
             if current_price >= self.stop_loss:
                 self.close()
-                self.log(f"STOP LOSS HIT: Price={current_price:.2f}")
+                self.log('STOP LOSS HIT: Price=%.2f', current_price)
                 return
             
             # Check for take profit
             if current_price <= self.take_profit:
                 self.close()
-                self.log(f"TAKE PROFIT HIT: Price={current_price:.2f}")
+                self.log('TAKE PROFIT HIT: Price=%.2f', current_price)
                 return
             
             # Trail stop after 2R
             if not self.trail_activated:
                 profit = self.entry_price - current_price
                 risk = self.stop_loss - self.entry_price
-                if profit >= (risk * self.params.trail_after_rr):
+                if profit >= (risk * self._trail):
                     self.stop_loss = self.entry_price  # Move to breakeven
                     self.trail_activated = True
-                    self.log(f"TRAILING STOP ACTIVATED: Moved SL to breakeven at {self.stop_loss:.2f}")
+                    self.log('TRAILING STOP ACTIVATED: Moved SL to breakeven at %.2f', self.stop_loss)
         
         # Check for breaker block or order block rejection
         self.check_structure_rejection(current_price)
     
     def check_structure_rejection(self, current_price):
         """Check for rejection from breaker blocks or order blocks"""
-        # Check breaker block rejection
-        for bb in self.breaker_blocks:
-            if bb['bottom'] <= current_price <= bb['top']:
-                if self.position.size > 0 and bb['type'] == 'bearish':  # Long position hitting bearish breaker
-                    self.close()
-                    self.log(f"REJECTION FROM BEARISH BREAKER BLOCK: Price={current_price:.2f}")
-                    return
-                elif self.position.size < 0 and bb['type'] == 'bullish':  # Short position hitting bullish breaker
-                    self.close()
-                    self.log(f"REJECTION FROM BULLISH BREAKER BLOCK: Price={current_price:.2f}")
-                    return
-        
-        # Check order block rejection
-        for ob in self.order_blocks:
-            if not ob['invalidated'] and ob['bottom'] <= current_price <= ob['top']:
-                if self.position.size > 0 and ob['type'] == 'bearish':  # Long position hitting bearish OB
-                    self.close()
-                    self.log(f"REJECTION FROM BEARISH ORDER BLOCK: Price={current_price:.2f}")
-                    return
-                elif self.position.size < 0 and ob['type'] == 'bullish':  # Short position hitting bullish OB
-                    self.close()
-                    self.log(f"REJECTION FROM BULLISH ORDER BLOCK: Price={current_price:.2f}")
-                    return
+        # Structure opposing the position: bearish for longs, bullish for shorts
+        opposite = -int(np.sign(self.position.size))
+        if not opposite:
+            return
+        
+        structure = self.rejecting_structure(current_price, opposite)
+        if structure:
+            self.close()
+            self.log('REJECTION FROM %s %s: Price=%.2f',
+                     ZONE_NAMES[opposite].upper(), structure, current_price)
     
     def notify_order(self, order):
         """Track order status"""
@@ -652,16 +332,16 @@ class SMCICTStrategy(bt.Strategy):
         
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log(f"BUY EXECUTED: Price={order.executed.price:.2f}, "
-                        f"Size={order.executed.size:.2f}, Cost={order.executed.value:.2f}")
+                self.log('BUY EXECUTED: Price=%.2f, Size=%.2f, Cost=%.2f',
+                         order.executed.price, order.executed.size, order.executed.value)
             else:
-                self.log(f"SELL EXECUTED: Price={order.executed.price:.2f}, "
-                        f"Size={order.executed.size:.2f}, Cost={order.executed.value:.2f}")
+                self.log('SELL EXECUTED: Price=%.2f, Size=%.2f, Cost=%.2f',
+                         order.executed.price, order.executed.size, order.executed.value)
             
             self.total_trades += 1
             
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
-            self.log(f"ORDER CANCELED/REJECTED: {order.status}")
+            self.log('ORDER CANCELED/REJECTED: %s', order.status)
         
         self.order = None
     
@@ -685,24 +365,26 @@ class SMCICTStrategy(bt.Strategy):
             if drawdown > self.max_drawdown:
                 self.max_drawdown = drawdown
         
-        self.log(f"TRADE CLOSED: PnL={pnl:.2f}, Total PnL={self.total_pnl:.2f}")
+        self.log('TRADE CLOSED: PnL=%.2f, Total PnL=%.2f', pnl, self.total_pnl)
     
     def stop(self):
-        """Print final performance statistics"""
+        """Print the buffered log and final performance statistics"""
+        self.flush_log()
+        
         win_rate = (self.winning_trades / self.total_trades * 100) if self.total_trades > 0 else 0
         avg_rr = self.total_pnl / self.total_trades if self.total_trades > 0 else 0
         
-        self.log("="*50)
-        self.log("FINAL PERFORMANCE STATISTICS")
-        self.log("="*50)
-        self.log(f"Total Trades: {self.total_trades}")
-        self.log(f"Winning Trades: {self.winning_trades}")
-        self.log(f"Win Rate: {win_rate:.2f}%")
-        self.log(f"Total PnL: ${self.total_pnl:.2f}")
-        self.log(f"Average PnL per Trade: ${avg_rr:.2f}")
-        self.log(f"Max Drawdown: {self.max_drawdown:.2f}%")
-        self.log(f"Final Portfolio Value: ${self.broker.getvalue():.2f}")
-        self.log("="*50)
+        self.print_log("="*50)
+        self.print_log("FINAL PERFORMANCE STATISTICS")
+        self.print_log("="*50)
+        self.print_log(f"Total Trades: {self.total_trades}")
+        self.print_log(f"Winning Trades: {self.winning_trades}")
+        self.print_log(f"Win Rate: {win_rate:.2f}%")
+        self.print_log(f"Total PnL: ${self.total_pnl:.2f}")
+        self.print_log(f"Average PnL per Trade: ${avg_rr:.2f}")
+        self.print_log(f"Max Drawdown: {self.max_drawdown:.2f}%")
+        self.print_log(f"Final Portfolio Value: ${self.broker.getvalue():.2f}")
+        self.print_log("="*50)
 
 
 def run_backtest():
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-time compile the Numba signal kernels
+
+Builds the ``smc_kernels_aot`` extension module next to this script with
+numba.pycc. When it is present, smc_kernels imports the compiled kernels
+from it, so backtests and parameter-sweep workers skip JIT compilation
+entirely. Without it smc_kernels falls back to the JIT versions.
+
+The AOT exports are typed for float64 price arrays, which is what
+as_float_array() produces. The module also exports a hash of smc_kernels.py;
+smc_kernels ignores a build whose hash does not match the current source, so
+rebuild after changing a kernel:
+
+    python build_kernels.py
+"""
+
+import os
+import sys
+
+from numba.pycc import CC
+
+# Compile from the JIT sources even if an older smc_kernels_aot is present
+sys.modules['smc_kernels_aot'] = None
+import smc_kernels
+
+
+def build():
+    """Compile the kernels into smc_kernels_aot"""
+    cc = CC('smc_kernels_aot')
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    cc.export('detect_fvgs', 'Tuple((b1[:], b1[:]))(f8[:], f8[:], f8)')(
+        smc_kernels.detect_fvgs.py_func)
+    cc.export('compute_filled_bars', 'Tuple((i8[:], i8[:]))(f8[:], f8[:], b1[:], b1[:])')(
+        smc_kernels.compute_filled_bars.py_func)
+    cc.export('compute_atr', 'f8[:](f8[:], f8[:], f8[:], i8)')(
+        smc_kernels.compute_atr.py_func)
+    
+    # Lets smc_kernels detect a build that is older than its source
+    kernel_hash = smc_kernels.kernel_source_hash()
+    
+    def source_hash():
+        return kernel_hash
+    
+    cc.export('source_hash', 'i8()')(source_hash)
+    
+    cc.compile()
+    print(f"Compiled kernels to {cc.output_dir}")
+
+
+if __name__ == '__main__':
+    build()
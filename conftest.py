@@ -0,0 +1,33 @@
+"""
+Shared pytest fixtures for the SMC/ICT bot tests
+"""
+
+import pytest
+
+from data_loader import NAS100DataLoader
+
+
+@pytest.fixture(scope="session")
+def sample_data():
+    """
+    Sample data factory shared by all tests in the session
+
+    Each (days, seed, end_date) combination is generated once per session
+    (once per worker under pytest-xdist).
+
+    Returns:
+        callable: sample_data(days=5, seed=42, end_date=None) returning
+            (data_15m, data_daily) shallow copies, so one test cannot rebind
+            columns or the index of another test's frames
+    """
+    cache = {}
+
+    def get(days=5, seed=42, end_date=None):
+        key = (days, seed, end_date)
+        if key not in cache:
+            cache[key] = NAS100DataLoader().generate_sample_data(
+                days=days, seed=seed, end_date=end_date)
+        data_15m, data_daily = cache[key]
+        return data_15m.copy(deep=False), data_daily.copy(deep=False)
+
+    return get
@@ -3,7 +3,52 @@ import numpy as np
 import yfinance as yf
 from datetime import datetime, timedelta
 import backtrader as bt
+from backtrader.utils import date2num
 import pytz
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ArrayPandasData(bt.feeds.PandasData):
+    """
+    PandasData feed that loads bars from preconverted arrays
+    
+    The stock feed reads every field of every bar with DataFrame.iloc and
+    converts each timestamp as it goes. This feed converts the mapped
+    columns to float64 and the timestamps to Backtrader date numbers once in
+    start(), so loading a bar is a handful of list lookups.
+    """
+    
+    def start(self):
+        super().start()
+        
+        df = self.p.dataname
+        self._columns = []
+        for datafield in self.getlinealiases():
+            colindex = self._colmapping[datafield]
+            if datafield == 'datetime' or colindex is None:
+                continue
+            values = np.ascontiguousarray(df.iloc[:, colindex], dtype=np.float64)
+            self._columns.append((getattr(self.lines, datafield), values.tolist()))
+        
+        # Same conversion as PandasData._load, done once for all bars
+        coldtime = self._colmapping['datetime']
+        timestamps = df.index if coldtime is None else df.iloc[:, coldtime]
+        self._datetimes = [date2num(dt) for dt in pd.DatetimeIndex(timestamps).to_pydatetime()]
+    
+    def _load(self):
+        self._idx += 1
+        
+        if self._idx >= len(self._datetimes):
+            # exhausted all rows
+            return False
+        
+        for line, values in self._columns:
+            line[0] = values[self._idx]
+        self.lines.datetime[0] = self._datetimes[self._idx]
+        
+        return True
 
 
 class NAS100DataLoader:
@@ -11,11 +56,13 @@ class NAS100DataLoader:
     Data loader for NAS100 (NASDAQ-100) data compatible with TradeLocker format
     """
     
-    def __init__(self):
+    def __init__(self, cache_dir="cache"):
         self.symbol = "^NDX"  # NASDAQ-100 index
         self.timezone = pytz.timezone('US/Eastern')
+        self.cache_dir = cache_dir
     
-    def fetch_data(self, start_date, end_date, interval_15m="15m", interval_daily="1d"):
+    def fetch_data(self, start_date, end_date, interval_15m="15m", interval_daily="1d",
+                   use_cache=True):
         """
         Fetch NAS100 data for both 15-minute and daily timeframes
         
@@ -24,34 +71,36 @@ class NAS100DataLoader:
             end_date (str): End date in 'YYYY-MM-DD' format
             interval_15m (str): 15-minute interval
             interval_daily (str): Daily interval
+            use_cache (bool): Reuse (and store) cleaned data in the Parquet cache
             
         Returns:
             tuple: (data_15m, data_daily) as pandas DataFrames
         """
         
-        # Fetch 15-minute data
+        cache_paths = self.cache_paths(start_date, end_date, interval_15m, interval_daily)
+        if use_cache:
+            cached = self.load_cache(cache_paths)
+            if cached is not None:
+                data_15m, data_daily = cached
+                print(f"Loaded {len(data_15m)} 15-minute bars and {len(data_daily)} daily bars from cache")
+                return data_15m, data_daily
+        
         ticker = yf.Ticker(self.symbol)
+        history_args = dict(
+            start=start_date,
+            end=end_date,
+            prepost=False,
+            auto_adjust=True,
+            back_adjust=False
+        )
         
         try:
-            # Get 15-minute data
-            data_15m = ticker.history(
-                start=start_date,
-                end=end_date,
-                interval=interval_15m,
-                prepost=False,
-                auto_adjust=True,
-                back_adjust=False
-            )
-            
-            # Get daily data
-            data_daily = ticker.history(
-                start=start_date,
-                end=end_date,
-                interval=interval_daily,
-                prepost=False,
-                auto_adjust=True,
-                back_adjust=False
-            )
+            # Request both timeframes at once so the downloads overlap
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                future_15m = executor.submit(ticker.history, interval=interval_15m, **history_args)
+                future_daily = executor.submit(ticker.history, interval=interval_daily, **history_args)
+                data_15m = future_15m.result()
+                data_daily = future_daily.result()
             
             # Clean and format data
             data_15m = self.clean_data(data_15m)
@@ -59,12 +108,69 @@ class NAS100DataLoader:
             
             print(f"Fetched {len(data_15m)} 15-minute bars and {len(data_daily)} daily bars")
             
+            if use_cache and not data_15m.empty and not data_daily.empty:
+                self.save_cache(cache_paths, (data_15m, data_daily))
+            
             return data_15m, data_daily
             
         except Exception as e:
             print(f"Error fetching data: {e}")
             return None, None
     
+    def cache_paths(self, start_date, end_date, interval_15m, interval_daily):
+        """
+        Parquet cache files for a fetch_data request
+        
+        Args:
+            start_date (str): Start date in 'YYYY-MM-DD' format
+            end_date (str): End date in 'YYYY-MM-DD' format
+            interval_15m (str): 15-minute interval
+            interval_daily (str): Daily interval
+            
+        Returns:
+            tuple: (path_15m, path_daily)
+        """
+        request = f"{self.symbol}|{start_date}|{end_date}|{interval_15m}|{interval_daily}"
+        key = hashlib.md5(request.encode()).hexdigest()
+        return (os.path.join(self.cache_dir, f"{key}_15m.parquet"),
+                os.path.join(self.cache_dir, f"{key}_daily.parquet"))
+    
+    def load_cache(self, paths):
+        """
+        Load cached data
+        
+        Args:
+            paths (tuple): Cache files from cache_paths()
+            
+        Returns:
+            tuple: DataFrames read from paths, or None if not cached
+        """
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        
+        try:
+            return tuple(pd.read_parquet(path) for path in paths)
+        except Exception as e:
+            print(f"Could not read cached data: {e}")
+            return None
+    
+    def save_cache(self, paths, frames):
+        """
+        Store data in the Parquet cache
+        
+        Caching is skipped if no Parquet engine (pyarrow) is installed.
+        
+        Args:
+            paths (tuple): Cache files from cache_paths()
+            frames (tuple): DataFrames to store, in the same order
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for path, df in zip(paths, frames):
+                df.to_parquet(path, compression='zstd')
+        except Exception as e:
+            print(f"Could not cache data: {e}")
+    
     def clean_data(self, df):
         """
         Clean and format the data for Backtrader
@@ -89,7 +195,7 @@ class NAS100DataLoader:
             'adj close': 'close',
             'adjclose': 'close'
         }
-        df = df.rename(columns=column_mapping)
+        df = df.rename(columns=column_mapping, copy=False)  # Relabel only, keep the buffers
         
         # Ensure we have the required columns
         required_columns = ['open', 'high', 'low', 'close', 'volume']
@@ -103,6 +209,13 @@ class NAS100DataLoader:
         # Sort by datetime index
         df = df.sort_index()
         
+        # Downcast to halve memory: float32 resolves index prices to well under
+        # a cent. Daily index volumes can exceed uint32, so check the range.
+        for col in ['open', 'high', 'low', 'close']:
+            df[col] = df[col].astype(np.float32)
+        if df['volume'].between(0, np.iinfo(np.uint32).max).all():
+            df['volume'] = df['volume'].astype(np.uint32)
+        
         return df
     
     def create_backtrader_feeds(self, data_15m, data_daily):
@@ -118,28 +231,22 @@ class NAS100DataLoader:
         """
         
         # Create 15-minute data feed
-        feed_15m = bt.feeds.PandasData(
+        data_15m, columns_15m = self._feed_columns(data_15m)
+        feed_15m = ArrayPandasData(
             dataname=data_15m,
             datetime=None,  # Use index as datetime
-            open=0,
-            high=1,
-            low=2,
-            close=3,
-            volume=4,
+            **columns_15m,
             openinterest=-1,  # Not used
             timeframe=bt.TimeFrame.Minutes,
             compression=15
         )
         
         # Create daily data feed
-        feed_daily = bt.feeds.PandasData(
+        data_daily, columns_daily = self._feed_columns(data_daily)
+        feed_daily = ArrayPandasData(
             dataname=data_daily,
             datetime=None,  # Use index as datetime
-            open=0,
-            high=1,
-            low=2,
-            close=3,
-            volume=4,
+            **columns_daily,
             openinterest=-1,  # Not used
             timeframe=bt.TimeFrame.Days,
             compression=1
@@ -147,92 +254,96 @@ class NAS100DataLoader:
         
         return feed_15m, feed_daily
     
-    def generate_sample_data(self, days=30):
+    def _feed_columns(self, df):
+        """
+        Prepare a DataFrame for ArrayPandasData
+        
+        Args:
+            df (pd.DataFrame): OHLCV data indexed by timestamp
+            
+        Returns:
+            tuple: (df in chronological order, dict of OHLCV column name ->
+                integer column position, whatever the column order)
+        """
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        columns = {name: df.columns.get_loc(name)
+                   for name in ('open', 'high', 'low', 'close', 'volume')}
+        return df, columns
+    
+    def generate_sample_data(self, days=30, seed=42, end_date=None):
         """
         Generate sample NAS100-like data for testing
         
         Args:
             days (int): Number of days to generate
+            seed (int): Random seed for the prices and volumes
+            end_date (datetime): End of the generated range (default: now).
+                Fixing it together with seed makes the data fully reproducible
             
         Returns:
             tuple: (data_15m, data_daily) as pandas DataFrames
         """
         
         # Generate date range
-        end_date = datetime.now()
+        if end_date is None:
+            end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
         # Generate 15-minute timestamps
         timestamps_15m = pd.date_range(
             start=start_date,
             end=end_date,
-            freq='15T'
+            freq='15min'
         )
         
         # Filter for market hours (9:30 AM to 4:00 PM ET)
-        market_hours = []
-        for ts in timestamps_15m:
-            if ts.weekday() < 5:  # Monday to Friday
-                et_time = ts.tz_localize('UTC').tz_convert('US/Eastern')
-                if 9.5 <= et_time.hour + et_time.minute/60 <= 16:
-                    market_hours.append(ts)
-        
-        timestamps_15m = pd.DatetimeIndex(market_hours)
-        
-        # Generate daily timestamps
-        timestamps_daily = pd.date_range(
-            start=start_date.date(),
-            end=end_date.date(),
-            freq='D'
-        )
-        timestamps_daily = timestamps_daily[timestamps_daily.weekday < 5]  # Weekdays only
+        et_times = timestamps_15m.tz_localize('UTC').tz_convert('US/Eastern')
+        et_minutes = et_times.hour * 60 + et_times.minute
+        market_hours = ((timestamps_15m.weekday < 5) &  # Monday to Friday
+                        (et_minutes >= 9 * 60 + 30) & (et_minutes <= 16 * 60))
+        
+        timestamps_15m = timestamps_15m[market_hours]
         
         # Generate realistic NAS100 price data
         base_price = 15000  # Approximate NAS100 level
         
         # 15-minute data
-        np.random.seed(42)  # For reproducible results
-        returns_15m = np.random.normal(0, 0.002, len(timestamps_15m))  # 0.2% volatility
-        prices_15m = [base_price]
-        
-        for ret in returns_15m[1:]:
-            prices_15m.append(prices_15m[-1] * (1 + ret))
-        
-        # Create OHLC data for 15-minute
-        data_15m = []
-        for i, price in enumerate(prices_15m):
-            high = price * (1 + abs(np.random.normal(0, 0.001)))
-            low = price * (1 - abs(np.random.normal(0, 0.001)))
-            open_price = price * (1 + np.random.normal(0, 0.0005))
-            close_price = price
-            volume = np.random.randint(1000, 10000)
-            
-            data_15m.append([open_price, high, low, close_price, volume])
+        rng = np.random.default_rng(seed)  # For reproducible results
+        returns_15m = rng.normal(0, 0.002, len(timestamps_15m))  # 0.2% volatility
+        
+        # Compound the returns from the base price (first return unused)
+        growth = 1 + returns_15m
+        growth[:1] = base_price
+        prices_15m = np.cumprod(growth)
+        
+        # Create OHLC data for 15-minute (noise for all bars drawn at once)
+        n_bars = len(prices_15m)
+        high_noise = np.abs(rng.normal(0, 0.001, n_bars))
+        low_noise = np.abs(rng.normal(0, 0.001, n_bars))
+        open_noise = rng.normal(0, 0.0005, n_bars)
+        volumes = rng.integers(1000, 10000, n_bars)
         
         df_15m = pd.DataFrame(
-            data_15m,
-            index=timestamps_15m,
-            columns=['open', 'high', 'low', 'close', 'volume']
+            {
+                'open': prices_15m * (1 + open_noise),
+                'high': prices_15m * (1 + high_noise),
+                'low': prices_15m * (1 - low_noise),
+                'close': prices_15m,
+                'volume': volumes,
+            },
+            index=timestamps_15m
         )
         
         # Daily data (aggregate from 15-minute)
-        daily_data = []
-        for date in timestamps_daily:
-            day_data = df_15m[df_15m.index.date == date.date()]
-            if not day_data.empty:
-                open_price = day_data.iloc[0]['open']
-                high_price = day_data['high'].max()
-                low_price = day_data['low'].min()
-                close_price = day_data.iloc[-1]['close']
-                volume = day_data['volume'].sum()
-                
-                daily_data.append([open_price, high_price, low_price, close_price, volume])
-        
-        df_daily = pd.DataFrame(
-            daily_data,
-            index=timestamps_daily[:len(daily_data)],
-            columns=['open', 'high', 'low', 'close', 'volume']
-        )
+        df_daily = df_15m.resample('1D').agg({
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+            'volume': 'sum'
+        }).dropna()
+        df_daily = df_daily[df_daily.index.weekday < 5]  # Weekdays only
         
         print(f"Generated {len(df_15m)} 15-minute bars and {len(df_daily)} daily bars")
         
@@ -254,25 +365,23 @@ class TradeLockerDataAdapter:
             symbol (str): Trading symbol
             
         Returns:
-            pd.DataFrame: TradeLocker formatted data
+            pd.DataFrame: TradeLocker formatted data. The OHLCV columns share
+                memory with df when it has exactly those columns.
         """
         
-        # Create a copy to avoid modifying original
-        formatted_df = df.copy()
-        
-        # Add symbol column
-        formatted_df['symbol'] = symbol
-        
-        # Ensure datetime index is timezone-aware
-        if formatted_df.index.tz is None:
-            formatted_df.index = formatted_df.index.tz_localize('UTC')
+        # Ensure datetime index is timezone-aware (index only, no data copied)
+        index = df.index
+        if index.tz is None:
+            index = index.tz_localize('UTC')
         
-        # Add timestamp column
-        formatted_df['timestamp'] = formatted_df.index
+        # Reuse the OHLCV buffers instead of copying the whole frame
+        ohlcv_columns = ['open', 'high', 'low', 'close', 'volume']
+        ohlcv = df if list(df.columns) == ohlcv_columns else df[ohlcv_columns]
+        ohlcv = ohlcv.set_axis(index, axis=0, copy=False)
         
-        # Reorder columns for TradeLocker
-        column_order = ['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
-        formatted_df = formatted_df[column_order]
+        # Prepend the symbol and timestamp columns for TradeLocker
+        labels = pd.DataFrame({'symbol': symbol, 'timestamp': index}, index=index)
+        formatted_df = pd.concat([labels, ohlcv], axis=1, copy=False)
         
         return formatted_df
     
@@ -287,6 +396,51 @@ class TradeLockerDataAdapter:
         """
         df.to_csv(filename, index=False)
         print(f"Data saved to {filename}")
+    
+    @staticmethod
+    def save_to_parquet(df, filename):
+        """
+        Save data to a Parquet file
+        
+        Much faster to write and read back than CSV, and smaller on disk.
+        Requires pyarrow; use save_to_csv for files imported into TradeLocker.
+        
+        Args:
+            df (pd.DataFrame): Data to save
+            filename (str): Output filename
+        """
+        df.to_parquet(filename, engine='pyarrow', compression='zstd', index=False)
+        print(f"Data saved to {filename}")
+
+
+def compute_vwap_bars(df, freq):
+    """
+    Resample OHLCV data to a coarser timeframe with a volume-weighted price
+    
+    VWAP is built from two summed columns (price * volume and volume), so
+    every aggregation runs in pandas' built-in reducers rather than a
+    Python callback per bucket.
+    
+    Args:
+        df (pd.DataFrame): OHLCV data with a DatetimeIndex
+        freq (str): Target bar size, e.g. '1h' or '1D'
+        
+    Returns:
+        pd.DataFrame: OHLCV bars plus a 'vwap' column; periods without
+            bars are dropped
+    """
+    bars = df.assign(_pv=df['close'] * df['volume']).resample(freq).agg({
+        'open': 'first',
+        'high': 'max',
+        'low': 'min',
+        'close': 'last',
+        'volume': 'sum',
+        '_pv': 'sum'
+    }).dropna(subset=['open'])
+    
+    # Bars with zero volume have no defined VWAP (left as NaN)
+    bars['vwap'] = bars['_pv'] / bars['volume'].where(bars['volume'] > 0)
+    return bars.drop(columns='_pv')
 
 
 def main():
@@ -327,6 +481,13 @@ def main():
     adapter.save_to_csv(tl_data_15m, "nas100_15m_data.csv")
     adapter.save_to_csv(tl_data_daily, "nas100_daily_data.csv")
     
+    # Save Parquet copies for fast reloading
+    try:
+        adapter.save_to_parquet(tl_data_15m, "nas100_15m_data.parquet")
+        adapter.save_to_parquet(tl_data_daily, "nas100_daily_data.parquet")
+    except ImportError:
+        print("pyarrow not installed, skipping Parquet export")
+    
     print("\nData summary:")
     print(f"15-minute data: {len(data_15m)} bars")
     print(f"Daily data: {len(data_daily)} bars")
@@ -0,0 +1,486 @@
+"""
+Market structure tracking for the SMC/ICT strategy
+
+MarketStructure holds the swing points, liquidity zones, Fair Value Gaps,
+Order Blocks and Breaker Blocks and updates them one bar at a time from raw
+OHLC arrays. It has no Backtrader dependency, so the same logic drives both
+SMCICTStrategy and the array-based signal pass in smc_signals.
+
+Subclasses provide ``params`` (lookback_period, liquidity_touches,
+fvg_min_size, ote_fib_low, ote_fib_high), a ``log(txt, *args)`` method, the
+``_O/_H/_L/_C/_DT`` price arrays and the current bar index ``_bar_i``.
+"""
+
+import numpy as np
+from smc_kernels import (as_float_array, detect_swings, detect_fvgs, detect_obs,
+                         compute_filled_bars)
+from zones import (ZoneBuffer, RingBuffer, BULLISH, BEARISH, SUPPORT, RESISTANCE,
+                   ZONE_NAMES, TYPE_DTYPE, IntervalIndex)
+
+
+class MarketStructure:
+    """
+    Mixin tracking SMC/ICT market structure bar by bar
+    """
+    
+    def init_structure(self):
+        """Create the empty structure state"""
+        
+        # Parameters read every bar, cached as plain numbers
+        self._min_touches = self.params.liquidity_touches
+        self._fib_low = float(self.params.ote_fib_low)
+        self._fib_high = float(self.params.ote_fib_high)
+        
+        # Structure tracking
+        self.swing_highs = RingBuffer(self.params.lookback_period, price=np.float64,
+                                      index=np.int64, datetime=np.float64)
+        self.swing_lows = RingBuffer(self.params.lookback_period, price=np.float64,
+                                     index=np.int64, datetime=np.float64)
+        self.last_bos_direction = 0  # 1 = bullish BoS, -1 = bearish BoS
+        self._ote_dirty = True  # OTE bounds need recomputing after a new swing
+        
+        # Liquidity zones
+        self.liquidity_zones = ZoneBuffer(type=TYPE_DTYPE, price=np.float64,
+                                          touches=np.int64, swept=np.bool_)
+        self._liquidity_buckets = {SUPPORT: {}, RESISTANCE: {}}  # price // 10 -> zone price
+        self._any_support_swept = False  # Any swept support zone currently stored
+        self._any_resistance_swept = False  # Any swept resistance zone currently stored
+        self._liquidity_candidates = {SUPPORT: None, RESISTANCE: None}  # Cached until a new swing
+        
+        # Fair Value Gaps
+        self.fvgs = ZoneBuffer(type=TYPE_DTYPE, top=np.float64,
+                               bottom=np.float64, index=np.int64)
+        
+        # Order Blocks
+        self.order_blocks = ZoneBuffer(type=TYPE_DTYPE, top=np.float64, bottom=np.float64,
+                                       index=np.int64, invalidated=np.bool_)
+        self._newly_invalidated = np.empty(0, dtype=np.int64)  # OB rows invalidated this bar
+        
+        # Breaker Blocks
+        self.breaker_blocks = ZoneBuffer(type=TYPE_DTYPE, top=np.float64, bottom=np.float64)
+        self._breaker_cells = {}  # (top // 5, bottom // 5) -> (top, bottom)
+        self._breaker_index = {BULLISH: IntervalIndex(), BEARISH: IntervalIndex()}
+        
+        # Precomputed pattern signals (filled by precompute_signals())
+        self._signals_len = 0
+    
+    def precompute_signals(self):
+        """
+        Run the swing/FVG/OB kernels over the whole 15-minute series
+        
+        The results are indexed by absolute bar number so the per-bar updates
+        only need O(1) lookups. Every signal at bar i depends on bars <= i only, so this
+        introduces no lookahead.
+        """
+        opens = as_float_array(self._O)
+        highs = as_float_array(self._H)
+        lows = as_float_array(self._L)
+        closes = as_float_array(self._C)
+        
+        self._swing_high_mask, self._swing_low_mask = detect_swings(highs, lows)
+        self._bull_fvg_mask, self._bear_fvg_mask = detect_fvgs(
+            highs, lows, float(self.params.fvg_min_size))
+        self._bull_fvg_filled_at, self._bear_fvg_filled_at = compute_filled_bars(
+            highs, lows, self._bull_fvg_mask, self._bear_fvg_mask)
+        self._last_bull_ob, self._last_bear_ob = detect_obs(opens, closes)
+        self._signals_len = len(closes)
+    
+    def update_structure(self):
+        """Update every structure component for the current bar"""
+        self.update_swing_points()
+        self.update_liquidity_zones()
+        self.update_fvgs()
+        self.update_order_blocks()
+        self.update_breaker_blocks()
+        
+        # Check for Break of Structure
+        self.check_break_of_structure()
+    
+    def update_swing_points(self):
+        """Identify and update swing highs and lows"""
+        if self._bar_i < 4:
+            return
+        
+        # Swing candidate is the bar two bars back (needs 2 bars on each side)
+        swing_bar = self._bar_i - 2
+        
+        # Check for swing high (high > 2 previous and 2 next highs)
+        if self._swing_high_mask[swing_bar]:
+            self.swing_highs.append(price=self._H[swing_bar],
+                                    index=swing_bar + 1,  # 1-based bar number
+                                    datetime=self._DT[swing_bar])
+            self._ote_dirty = True
+            self._liquidity_candidates[RESISTANCE] = None
+        
+        # Check for swing low
+        if self._swing_low_mask[swing_bar]:
+            self.swing_lows.append(price=self._L[swing_bar],
+                                   index=swing_bar + 1,  # 1-based bar number
+                                   datetime=self._DT[swing_bar])
+            self._ote_dirty = True
+            self._liquidity_candidates[SUPPORT] = None
+    
+    def update_liquidity_zones(self):
+        """Identify liquidity zones (equal highs/lows)"""
+        zones = self.liquidity_zones
+        
+        # Clean old liquidity zones (only swept zones are removed, and every
+        # sweep sets one of the flags)
+        if self._any_support_swept or self._any_resistance_swept:
+            zones.keep(~zones.swept)
+            self._any_support_swept = False
+            self._any_resistance_swept = False
+        
+        # Check for equal highs
+        if len(self.swing_highs) >= self._min_touches:
+            self.add_liquidity_zones(self.swing_highs, RESISTANCE)
+        
+        # Check for equal lows
+        if len(self.swing_lows) >= self._min_touches:
+            self.add_liquidity_zones(self.swing_lows, SUPPORT)
+        
+        # Check for liquidity grabs
+        current_high = self._H[self._bar_i]
+        current_low = self._L[self._bar_i]
+        current_close = self._C[self._bar_i]
+        
+        prices = zones.price
+        grabbed_above = ((zones.type == RESISTANCE) &
+                         (current_high > prices) & (current_close < prices))
+        grabbed_below = ((zones.type == SUPPORT) &
+                         (current_low < prices) & (current_close > prices))
+        grabbed = (grabbed_above | grabbed_below) & ~zones.swept
+        
+        for i in np.flatnonzero(grabbed):
+            zones.swept[i] = True
+            price = float(prices[i])
+            zone_type = int(zones.type[i])
+            self.remove_liquidity_bucket(price, zone_type)
+            if zone_type == RESISTANCE:
+                self._any_resistance_swept = True
+                self.log('Liquidity grab above resistance at %s', price)
+            else:
+                self._any_support_swept = True
+                self.log('Liquidity grab below support at %s', price)
+    
+    def add_liquidity_zones(self, swings, zone_type):
+        """
+        Add liquidity zones where recent swing prices cluster
+        
+        Args:
+            swings (RingBuffer): Swing highs or swing lows
+            zone_type (int): RESISTANCE or SUPPORT
+        """
+        # Candidates only change when a swing is recorded
+        candidates = self._liquidity_candidates[zone_type]
+        if candidates is None:
+            candidates = self.liquidity_candidates(swings)
+            self._liquidity_candidates[zone_type] = candidates
+        
+        buckets = self._liquidity_buckets[zone_type]
+        for price, touches in candidates:
+            # Check if already exists (zones within 10 points share a neighbouring bucket)
+            key = int(price // 10)
+            exists = any(abs(buckets[k] - price) <= 10
+                         for k in (key - 1, key, key + 1) if k in buckets)
+            
+            if not exists:
+                self.liquidity_zones.append(type=zone_type, price=price,
+                                            touches=touches, swept=False)
+                buckets[key] = price
+    
+    def liquidity_candidates(self, swings):
+        """
+        Find the recent swing prices touched often enough to form a zone
+        
+        Args:
+            swings (RingBuffer): Swing highs or swing lows
+            
+        Returns:
+            list: (price, touches) tuples, oldest swing first
+        """
+        prices = swings.recent('price', 10)  # Last 10 swing points
+        
+        # Touches = the swing itself plus every later swing within 10 points
+        within = np.abs(prices[:, None] - prices[None, :]) <= 10
+        touches = np.triu(within, k=1).sum(axis=1) + 1
+        
+        return [(float(prices[i]), int(touches[i]))
+                for i in np.flatnonzero(touches[:-1] >= self._min_touches)]
+    
+    def remove_liquidity_bucket(self, price, zone_type):
+        """Drop a swept liquidity zone from the dedup buckets"""
+        buckets = self._liquidity_buckets[zone_type]
+        key = int(price // 10)
+        if buckets.get(key) == price:
+            del buckets[key]
+    
+    def update_fvgs(self):
+        """Identify Fair Value Gaps"""
+        bar = self._bar_i
+        if bar < 2:
+            return
+        
+        # Clean filled FVGs
+        self.fvgs.keep(self.fvg_filled_at() > bar)
+        
+        # Check for new bullish FVG
+        if self._bull_fvg_mask[bar]:
+            top = self._L[bar]
+            bottom = self._H[bar - 2]
+            self.fvgs.append(type=BULLISH, top=top, bottom=bottom,
+                             index=bar + 1)
+            self.log('Bullish FVG identified: %.2f - %.2f', bottom, top)
+        
+        # Check for new bearish FVG
+        if self._bear_fvg_mask[bar]:
+            top = self._L[bar - 2]
+            bottom = self._H[bar]
+            self.fvgs.append(type=BEARISH, top=top, bottom=bottom,
+                             index=bar + 1)
+            self.log('Bearish FVG identified: %.2f - %.2f', bottom, top)
+    
+    def fvg_filled_at(self):
+        """Return the precomputed bar at which each active FVG gets filled"""
+        fvgs = self.fvgs
+        completed = fvgs.index - 1  # Bar that completed the gap
+        return np.where(fvgs.type == BULLISH,
+                        self._bull_fvg_filled_at[completed],
+                        self._bear_fvg_filled_at[completed])
+    
+    def update_order_blocks(self):
+        """Identify Order Blocks"""
+        if self._bar_i < 9:
+            return
+        
+        # Clean old order blocks (keep only recent ones)
+        self.order_blocks.keep_last(20)  # Keep last 20
+        
+        # Most recent OB candle at least 5 bars back
+        search_bar = self._bar_i - 5
+        
+        # Look for bullish order block (last up candle before down move)
+        ob_bar = self._last_bull_ob[search_bar]
+        if ob_bar >= 0:
+            self.add_order_block(BULLISH, search_bar + 5 - ob_bar)
+        
+        # Look for bearish order block (last down candle before up move)
+        ob_bar = self._last_bear_ob[search_bar]
+        if ob_bar >= 0:
+            self.add_order_block(BEARISH, search_bar + 5 - ob_bar)
+        
+        # Check for order block invalidation
+        current_close = self._C[self._bar_i]
+        obs = self.order_blocks
+        invalid = (((obs.type == BULLISH) & (current_close < obs.bottom)) |
+                   ((obs.type == BEARISH) & (current_close > obs.top)))
+        self._newly_invalidated = np.flatnonzero(invalid & ~obs.invalidated)
+        obs.invalidated |= invalid
+    
+    def add_order_block(self, ob_type, bars_back):
+        """
+        Add an Order Block from the candle bars_back bars ago unless it already exists
+        
+        Args:
+            ob_type (int): BULLISH or BEARISH
+            bars_back (int): Offset of the OB candle from the current bar
+        """
+        ob_bar = self._bar_i - bars_back
+        top = self._H[ob_bar]
+        bottom = self._L[ob_bar]
+        
+        # Check if already exists
+        obs = self.order_blocks
+        exists = np.any((obs.type == ob_type) &
+                        (np.abs(obs.top - top) <= 5) &
+                        (np.abs(obs.bottom - bottom) <= 5))
+        
+        if not exists:
+            obs.append(type=ob_type, top=top, bottom=bottom,
+                       index=ob_bar + 1, invalidated=False)
+            self.log('%s Order Block: %.2f - %.2f', ZONE_NAMES[ob_type].capitalize(), bottom, top)
+    
+    def update_breaker_blocks(self):
+        """Identify Breaker Blocks (invalidated order blocks that become resistance/support)"""
+        obs = self.order_blocks
+        breakers = self.breaker_blocks
+        
+        # Breakers are never removed, so an order block invalidated on an
+        # earlier bar either became a breaker or matched one that still
+        # exists: only this bar's invalidations can add anything
+        for i in self._newly_invalidated:
+            # Convert to breaker block (opposite type)
+            breaker_type = -int(obs.type[i])
+            top = float(obs.top[i])
+            bottom = float(obs.bottom[i])
+            
+            # Check if already exists
+            if not self.breaker_exists(top, bottom):
+                breakers.append(type=breaker_type, top=top, bottom=bottom)
+                self._breaker_cells[(int(top // 5), int(bottom // 5))] = (top, bottom)
+                self._breaker_index[breaker_type].add(bottom, top)
+                self.log('Breaker Block formed: %s at %.2f - %.2f', ZONE_NAMES[breaker_type], bottom, top)
+    
+    def breaker_exists(self, top, bottom):
+        """
+        Check for a stored breaker within 5 points of both bounds
+        
+        Breakers are hashed into 5x5-point cells, so any match lies in one of
+        the 9 cells around (top // 5, bottom // 5).
+        """
+        col, row = int(top // 5), int(bottom // 5)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                cell = self._breaker_cells.get((col + dx, row + dy))
+                if (cell is not None and abs(cell[0] - top) <= 5 and
+                        abs(cell[1] - bottom) <= 5):
+                    return True
+        return False
+    
+    def check_break_of_structure(self):
+        """Check for Break of Structure"""
+        if not self.swing_highs or not self.swing_lows:
+            return
+        
+        current_close = self._C[self._bar_i]
+        # Swings are appended in bar order, so the highest index is the newest
+        # entry and the lowest index the oldest one still retained
+        last_swing_high = self.swing_highs.newest('price')
+        last_swing_low = self.swing_lows.oldest('price')
+        
+        # Bullish BoS
+        if current_close > last_swing_high and self.last_bos_direction != 1:
+            self.last_bos_direction = 1
+            self.log('Bullish Break of Structure at %.2f', current_close)
+        
+        # Bearish BoS
+        elif current_close < last_swing_low and self.last_bos_direction != -1:
+            self.last_bos_direction = -1
+            self.log('Bearish Break of Structure at %.2f', current_close)
+    
+    def check_long_conditions(self, current_price):
+        """Check conditions for long entry (cheapest checks first)"""
+        # 1. Bullish BoS
+        if self.last_bos_direction != 1:
+            return False
+        
+        # 2. Liquidity grab below recent swing low
+        if not self._any_support_swept:
+            return False
+        
+        # 3. Price in bullish FVG
+        fvgs = self.fvgs
+        if not np.any((fvgs.type == BULLISH) &
+                      (fvgs.bottom <= current_price) & (current_price <= fvgs.top)):
+            return False
+        
+        # 4. Bullish order block support
+        obs = self.order_blocks
+        if not np.any((obs.type == BULLISH) & ~obs.invalidated &
+                      (obs.bottom <= current_price) & (current_price <= obs.top)):
+            return False
+        
+        # 5. OTE zone (61.8% - 79% retracement)
+        return self.check_ote_zone(current_price, 'bullish')
+    
+    def check_short_conditions(self, current_price):
+        """Check conditions for short entry (cheapest checks first)"""
+        # 1. Bearish BoS
+        if self.last_bos_direction != -1:
+            return False
+        
+        # 2. Liquidity grab above recent swing high
+        if not self._any_resistance_swept:
+            return False
+        
+        # 3. Price in bearish FVG
+        fvgs = self.fvgs
+        if not np.any((fvgs.type == BEARISH) &
+                      (fvgs.bottom <= current_price) & (current_price <= fvgs.top)):
+            return False
+        
+        # 4. Bearish order block resistance
+        obs = self.order_blocks
+        if not np.any((obs.type == BEARISH) & ~obs.invalidated &
+                      (obs.bottom <= current_price) & (current_price <= obs.top)):
+            return False
+        
+        # 5. OTE zone (61.8% - 79% retracement)
+        return self.check_ote_zone(current_price, 'bearish')
+    
+    def check_ote_zone(self, current_price, direction):
+        """Check if price is in Optimal Trade Entry zone"""
+        if not self.swing_highs or not self.swing_lows:
+            return False
+        
+        # Fib levels only move when a new swing point is recorded
+        if self._ote_dirty:
+            self.update_ote_bounds()
+        
+        if direction == 'bullish':
+            return self._ote_bull_lo <= current_price <= self._ote_bull_hi
+        else:  # bearish
+            return self._ote_bear_lo <= current_price <= self._ote_bear_hi
+    
+    def update_ote_bounds(self):
+        """Recompute the OTE Fibonacci bounds from the current swing points"""
+        recent_low = self.swing_lows.oldest('price')
+        recent_high = self.swing_highs.newest('price')
+        
+        if recent_high > recent_low:
+            range_size = recent_high - recent_low
+            
+            # Bullish: retracement down from the swing high
+            self._ote_bull_lo = recent_high - (range_size * self._fib_high)
+            self._ote_bull_hi = recent_high - (range_size * self._fib_low)
+            
+            # Bearish: retracement up from the swing low
+            self._ote_bear_lo = recent_low + (range_size * self._fib_low)
+            self._ote_bear_hi = recent_low + (range_size * self._fib_high)
+        else:
+            # No valid range: NaN bounds never contain a price
+            self._ote_bull_lo = self._ote_bull_hi = float('nan')
+            self._ote_bear_lo = self._ote_bear_hi = float('nan')
+        
+        self._ote_dirty = False
+    
+    def swept_liquidity_price(self, zone_type):
+        """
+        Return the extreme price of the swept liquidity zones of one type
+        
+        Args:
+            zone_type (int): SUPPORT (lowest price) or RESISTANCE (highest price)
+            
+        Returns:
+            float: Zone price, or None if no zone of that type was swept
+        """
+        zones = self.liquidity_zones
+        swept = (zones.type == zone_type) & zones.swept
+        if not swept.any():
+            return None
+        prices = zones.price[swept]
+        return float(prices.min() if zone_type == SUPPORT else prices.max())
+    
+    def rejecting_structure(self, current_price, zone_type):
+        """
+        Find the structure of one type that price is currently inside
+        
+        Breaker blocks take precedence over (non-invalidated) order blocks.
+        Breakers are never removed and can number in the thousands on long
+        runs, so they are looked up in a per-type IntervalIndex.
+        
+        Args:
+            current_price (float): Price to test
+            zone_type (int): BULLISH or BEARISH
+            
+        Returns:
+            str: 'BREAKER BLOCK', 'ORDER BLOCK' or None
+        """
+        if self._breaker_index[zone_type].contains(current_price):
+            return 'BREAKER BLOCK'
+        
+        obs = self.order_blocks
+        if np.any((obs.type == zone_type) & ~obs.invalidated &
+                  (obs.bottom <= current_price) & (current_price <= obs.top)):
+            return 'ORDER BLOCK'
+        return None
@@ -8,8 +8,15 @@ with data loading, backtesting, and performance analysis.
 Compatible with TradeLocker bot engine.
 """
 
+import os
+import io
+import importlib.util
+import contextlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 import backtrader as bt
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import warnings
@@ -20,23 +27,70 @@ from bot import SMCICTStrategy
 from data_loader import NAS100DataLoader, TradeLockerDataAdapter
 
 
+# Performance keys taken from the flattened Backtrader analyzer results
+ANALYZER_METRICS = {
+    'total_trades': 'trades.total.total',
+    'winning_trades': 'trades.won.total',
+    'losing_trades': 'trades.lost.total',
+    'avg_win': 'trades.won.pnl.average',
+    'avg_loss': 'trades.lost.pnl.average',
+    'max_drawdown_pct': 'drawdown.max.drawdown',
+    'sharpe_ratio': 'sharpe.sharperatio',
+}
+
+# display_performance() rows: (label, performance key, value format)
+SUMMARY_ROWS = [
+    ('Initial Capital', 'start_value', '${:,.2f}'),
+    ('Final Value', 'end_value', '${:,.2f}'),
+    ('Total Return', 'total_return_pct', '{:+.2f}%'),
+    ('Duration', 'duration', '{}'),
+]
+TRADE_COUNT_ROWS = [
+    ('Total Trades', 'total_trades', '{}'),
+    ('Winning Trades', 'winning_trades', '{}'),
+    ('Losing Trades', 'losing_trades', '{}'),
+    ('Win Rate', 'win_rate_pct', '{:.2f}%'),
+]
+TRADE_PNL_ROWS = [
+    ('Average Win', 'avg_win', '${:,.2f}'),
+    ('Average Loss', 'avg_loss', '${:,.2f}'),
+    ('Profit Factor', 'profit_factor', '{:.2f}'),
+]
+RISK_ROWS = [
+    ('Max Drawdown', 'max_drawdown_pct', '{:.2f}%'),
+    ('Sharpe Ratio', 'sharpe_ratio', '{:.3f}'),
+]
+
+
 class SMCBotRunner:
     """
     Main runner class for the SMC/ICT trading bot
     """
     
-    def __init__(self, initial_capital=100000, commission=0.001):
+    def __init__(self, initial_capital=100000, commission=0.001, engine='backtrader'):
         """
         Initialize the bot runner
         
         Args:
             initial_capital (float): Starting capital
             commission (float): Commission rate (0.001 = 0.1%)
+            engine (str): 'backtrader' for the bar-by-bar reference mode or
+                'vectorbt' for the one-shot vectorized backtest, which does not
+                model the daily trade cap or the breakeven trail
         """
+        if engine == 'vectorbt' and importlib.util.find_spec('vectorbt') is None:
+            print("vectorbt not installed, using the Backtrader engine")
+            engine = 'backtrader'
+        
         self.initial_capital = initial_capital
         self.commission = commission
+        self.engine = engine
         self.cerebro = None
         self.results = None
+        self.portfolio = None
+        self.strategy_params = {}
+        self.data_15m = None
+        self.data_daily = None
         
     def setup_cerebro(self, strategy_params=None):
         """
@@ -46,6 +100,7 @@ class SMCBotRunner:
             strategy_params (dict): Strategy parameters to override defaults
         """
         self.cerebro = bt.Cerebro()
+        self.strategy_params = dict(strategy_params or {})
         
         # Add strategy with custom parameters
         if strategy_params:
@@ -65,13 +120,34 @@ class SMCBotRunner:
         
         print("Cerebro engine configured successfully")
     
-    def load_data(self, days=30, use_real_data=True):
+    def fetch_real_data(self, days=30):
+        """
+        Fetch real NAS100 data for the last few days
+        
+        Safe to call from a background thread, e.g. to download the data
+        while setup_cerebro() runs.
+        
+        Args:
+            days (int): Number of days of data to fetch
+            
+        Returns:
+            tuple: (data_15m, data_daily), (None, None) if the fetch failed
+        """
+        end_date = datetime.now().strftime('%Y-%m-%d')
+        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        
+        print(f"Fetching real NAS100 data from {start_date} to {end_date}...")
+        return NAS100DataLoader().fetch_data(start_date, end_date)
+    
+    def load_data(self, days=30, use_real_data=True, prefetched=None):
         """
         Load NAS100 data for backtesting
         
         Args:
             days (int): Number of days of data to load
             use_real_data (bool): Whether to try fetching real data first
+            prefetched (tuple): (data_15m, data_daily) already returned by
+                fetch_real_data(), used instead of fetching again
             
         Returns:
             bool: True if data loaded successfully
@@ -80,11 +156,9 @@ class SMCBotRunner:
         
         if use_real_data:
             try:
-                end_date = datetime.now().strftime('%Y-%m-%d')
-                start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-                
-                print(f"Fetching real NAS100 data from {start_date} to {end_date}...")
-                data_15m, data_daily = loader.fetch_data(start_date, end_date)
+                if prefetched is None:
+                    prefetched = self.fetch_real_data(days)
+                data_15m, data_daily = prefetched
                 
                 if data_15m is None or data_daily is None or len(data_15m) < 100:
                     raise Exception("Insufficient real data")
@@ -101,19 +175,70 @@ class SMCBotRunner:
             print("Failed to load data")
             return False
         
+        self.add_data(data_15m, data_daily)
+        
+        print(f"Data loaded successfully:")
+        print(f"  - 15-minute bars: {len(data_15m)}")
+        print(f"  - Daily bars: {len(data_daily)}")
+        print(f"  - Date range: {data_15m.index[0]} to {data_15m.index[-1]}")
+        
+        return True
+    
+    def add_data(self, data_15m, data_daily):
+        """
+        Add already loaded 15-minute and daily data to the runner
+        
+        Args:
+            data_15m (pd.DataFrame): 15-minute OHLCV data
+            data_daily (pd.DataFrame): Daily OHLCV data
+        """
+        # Keep the frames for the vectorized engine and parameter sweeps
+        self.data_15m = data_15m
+        self.data_daily = data_daily
+        
         # Create Backtrader feeds
+        loader = NAS100DataLoader()
         feed_15m, feed_daily = loader.create_backtrader_feeds(data_15m, data_daily)
         
         # Add data feeds to Cerebro
         self.cerebro.adddata(feed_15m, name='NAS100_15m')
         self.cerebro.adddata(feed_daily, name='NAS100_daily')
+    
+    def run_backtests(self, param_grid, processes=None):
+        """
+        Run one backtest per parameter set in parallel worker processes
         
-        print(f"Data loaded successfully:")
-        print(f"  - 15-minute bars: {len(data_15m)}")
-        print(f"  - Daily bars: {len(data_daily)}")
-        print(f"  - Date range: {data_15m.index[0]} to {data_15m.index[-1]}")
+        Each worker builds its own engine from the data loaded with
+        load_data(). Workers are started with the 'spawn' method so they
+        behave the same on every platform ('spawn' is the only method on
+        Windows and the default on macOS), and because forking while the
+        caller has other threads running (e.g. a background data prefetch
+        like main()'s) can leave their locks held in the child.
         
-        return True
+        Args:
+            param_grid (list): Strategy parameter dicts, one per backtest
+            processes (int): Number of worker processes (default: CPU count)
+            
+        Returns:
+            list: Performance dicts in the same order as param_grid
+        """
+        if self.data_15m is None:
+            raise ValueError("No data loaded. Call load_data() first.")
+        
+        if not param_grid:
+            return []
+        
+        processes = max(1, min(processes or os.cpu_count() or 1, len(param_grid)))
+        tasks = [(dict(params), self.initial_capital, self.commission, self.engine)
+                 for params in param_grid]
+        
+        print(f"Running {len(tasks)} backtests on {processes} processes...")
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(processes, initializer=_init_backtest_worker,
+                          initargs=(self.data_15m, self.data_daily)) as pool:
+            results = pool.starmap(_run_backtest_worker, tasks)
+        
+        return results
     
     def run_backtest(self):
         """
@@ -129,6 +254,9 @@ class SMCBotRunner:
         print("STARTING SMC/ICT BOT BACKTEST")
         print("="*60)
         
+        if self.engine == 'vectorbt':
+            return self.run_vectorbt()
+        
         # Record start time and portfolio value
         start_time = datetime.now()
         start_value = self.cerebro.broker.getvalue()
@@ -149,6 +277,79 @@ class SMCBotRunner:
         
         return performance
     
+    def run_vectorbt(self):
+        """
+        Run the one-shot vectorized backtest on the loaded data
+        
+        Returns:
+            dict: Performance results
+        """
+        if self.data_15m is None:
+            raise ValueError("No data loaded. Call load_data() first.")
+        
+        # Imported here: vectorbt takes seconds to load and the Backtrader
+        # engine (and every sweep worker using it) never needs it
+        from smc_signals import run_vectorbt_backtest
+        
+        start_time = datetime.now()
+        self.portfolio = run_vectorbt_backtest(
+            self.data_15m, self.data_daily,
+            initial_capital=self.initial_capital,
+            commission=self.commission,
+            **self.strategy_params
+        )
+        end_time = datetime.now()
+        
+        print("\n" + "="*60)
+        print("BACKTEST COMPLETED")
+        print("="*60)
+        
+        return self.calculate_vectorbt_performance(start_time, end_time)
+    
+    def calculate_vectorbt_performance(self, start_time, end_time):
+        """
+        Calculate and display performance metrics of the vectorbt portfolio
+        
+        Args:
+            start_time (datetime): Backtest start time
+            end_time (datetime): Backtest end time
+            
+        Returns:
+            dict: Performance metrics (same keys as calculate_performance)
+        """
+        portfolio = self.portfolio
+        trades = portfolio.trades.closed
+        
+        start_value = self.initial_capital
+        end_value = float(portfolio.final_value())
+        total_trades = int(trades.count())
+        winning_trades = int(trades.winning.count())
+        losing_trades = int(trades.losing.count())
+        
+        avg_win = float(trades.winning.pnl.mean()) if winning_trades > 0 else 0
+        avg_loss = float(trades.losing.pnl.mean()) if losing_trades > 0 else 0
+        sharpe_ratio = float(portfolio.sharpe_ratio())
+        
+        performance = {
+            'start_value': start_value,
+            'end_value': end_value,
+            'total_return_pct': (end_value - start_value) / start_value * 100,
+            'total_trades': total_trades,
+            'winning_trades': winning_trades,
+            'losing_trades': losing_trades,
+            'win_rate_pct': (winning_trades / total_trades * 100) if total_trades > 0 else 0,
+            'avg_win': avg_win,
+            'avg_loss': avg_loss,
+            'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0,
+            'max_drawdown_pct': abs(float(portfolio.max_drawdown())) * 100,
+            'sharpe_ratio': sharpe_ratio if np.isfinite(sharpe_ratio) else None,
+            'duration': end_time - start_time
+        }
+        
+        self.display_performance(performance)
+        
+        return performance
+    
     def calculate_performance(self, start_value, end_value, start_time, end_time):
         """
         Calculate and display performance metrics
@@ -165,31 +366,20 @@ class SMCBotRunner:
         if not self.results:
             return {}
         
-        # Get analyzer results
+        # Flatten the analyzer results once, e.g. {'trades.won.total': 3}
         strategy = self.results[0]
-        trades_analyzer = strategy.analyzers.trades.get_analysis()
-        sharpe_analyzer = strategy.analyzers.sharpe.get_analysis()
-        drawdown_analyzer = strategy.analyzers.drawdown.get_analysis()
-        returns_analyzer = strategy.analyzers.returns.get_analysis()
+        analysis = {}
+        for name in ('trades', 'sharpe', 'drawdown'):
+            analysis.update(_flatten(getattr(strategy.analyzers, name).get_analysis(), name))
+        metrics = {key: analysis.get(path, 0) for key, path in ANALYZER_METRICS.items()}
         
         # Calculate basic metrics
         total_return = (end_value - start_value) / start_value * 100
         duration = end_time - start_time
         
-        # Extract trade statistics
-        total_trades = trades_analyzer.total.total if 'total' in trades_analyzer else 0
-        winning_trades = trades_analyzer.won.total if 'won' in trades_analyzer else 0
-        losing_trades = trades_analyzer.lost.total if 'lost' in trades_analyzer else 0
-        
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-        
-        # Average trade metrics
-        avg_win = trades_analyzer.won.pnl.average if 'won' in trades_analyzer and trades_analyzer.won.total > 0 else 0
-        avg_loss = trades_analyzer.lost.pnl.average if 'lost' in trades_analyzer and trades_analyzer.lost.total > 0 else 0
-        
-        # Risk metrics
-        max_drawdown = drawdown_analyzer.max.drawdown if 'max' in drawdown_analyzer else 0
-        sharpe_ratio = sharpe_analyzer.get('sharperatio', 0) if sharpe_analyzer else 0
+        total_trades = metrics['total_trades']
+        win_rate = (metrics['winning_trades'] / total_trades * 100) if total_trades > 0 else 0
+        avg_win, avg_loss = metrics['avg_win'], metrics['avg_loss']
         
         # Compile performance dictionary
         performance = {
@@ -197,14 +387,14 @@ class SMCBotRunner:
             'end_value': end_value,
             'total_return_pct': total_return,
             'total_trades': total_trades,
-            'winning_trades': winning_trades,
-            'losing_trades': losing_trades,
+            'winning_trades': metrics['winning_trades'],
+            'losing_trades': metrics['losing_trades'],
             'win_rate_pct': win_rate,
             'avg_win': avg_win,
             'avg_loss': avg_loss,
             'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0,
-            'max_drawdown_pct': max_drawdown,
-            'sharpe_ratio': sharpe_ratio,
+            'max_drawdown_pct': metrics['max_drawdown_pct'],
+            'sharpe_ratio': metrics['sharpe_ratio'],
             'duration': duration
         }
         
@@ -223,33 +413,19 @@ class SMCBotRunner:
         print("\n" + "="*60)
         print("PERFORMANCE SUMMARY")
         print("="*60)
-        
-        print(f"Initial Capital:      ${performance['start_value']:,.2f}")
-        print(f"Final Value:          ${performance['end_value']:,.2f}")
-        print(f"Total Return:         {performance['total_return_pct']:+.2f}%")
-        print(f"Duration:             {performance['duration']}")
+        _print_rows(performance, SUMMARY_ROWS)
         
         print("\n" + "-"*40)
         print("TRADE STATISTICS")
         print("-"*40)
-        
-        print(f"Total Trades:         {performance['total_trades']}")
-        print(f"Winning Trades:       {performance['winning_trades']}")
-        print(f"Losing Trades:        {performance['losing_trades']}")
-        print(f"Win Rate:             {performance['win_rate_pct']:.2f}%")
-        
+        _print_rows(performance, TRADE_COUNT_ROWS)
         if performance['total_trades'] > 0:
-            print(f"Average Win:          ${performance['avg_win']:,.2f}")
-            print(f"Average Loss:         ${performance['avg_loss']:,.2f}")
-            print(f"Profit Factor:        {performance['profit_factor']:.2f}")
+            _print_rows(performance, TRADE_PNL_ROWS)
         
         print("\n" + "-"*40)
         print("RISK METRICS")
         print("-"*40)
-        
-        print(f"Max Drawdown:         {performance['max_drawdown_pct']:.2f}%")
-        sharpe_display = f"{performance['sharpe_ratio']:.3f}" if performance['sharpe_ratio'] is not None else "N/A"
-        print(f"Sharpe Ratio:         {sharpe_display}")
+        _print_rows(performance, RISK_ROWS)
         
         print("\n" + "="*60)
     
@@ -265,6 +441,10 @@ class SMCBotRunner:
             print("No results to plot. Run backtest first.")
             return
         
+        if self.portfolio is not None:
+            self.portfolio.plot().show()
+            return
+        
         try:
             # Plot with Backtrader's built-in plotting
             self.cerebro.plot(style='candlestick', barup='green', bardown='red')
@@ -280,6 +460,62 @@ class SMCBotRunner:
             print("Plotting requires matplotlib and may not work in all environments")
 
 
+def _flatten(analysis, prefix):
+    """
+    Flatten nested Backtrader analyzer results into dotted keys
+    
+    Args:
+        analysis (dict): Result of an analyzer's get_analysis()
+        prefix (str): Key prefix, e.g. the analyzer name
+        
+    Returns:
+        dict: Leaf values keyed like 'trades.won.pnl.average'
+    """
+    flat = {}
+    for key, value in analysis.items():
+        path = f"{prefix}.{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def _print_rows(performance, rows):
+    """Print (label, key, format) rows of a performance dict, N/A for None"""
+    for label, key, fmt in rows:
+        value = performance[key]
+        print(f"{label + ':':<22}{'N/A' if value is None else fmt.format(value)}")
+
+
+# Data shared by the backtest worker processes (set once per worker)
+_worker_data = {}
+
+
+def _init_backtest_worker(data_15m, data_daily):
+    """Store the backtest data in a worker process"""
+    _worker_data['15m'] = data_15m
+    _worker_data['daily'] = data_daily
+
+
+def _run_backtest_worker(strategy_params, initial_capital, commission, engine):
+    """
+    Run a single backtest inside a worker process
+    
+    Returns:
+        dict: Performance metrics
+    """
+    # Per-bar logs from several processes would interleave; keep them quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        runner = SMCBotRunner(initial_capital, commission, engine)
+        runner.setup_cerebro(strategy_params)
+        runner.add_data(_worker_data['15m'], _worker_data['daily'])
+        performance = runner.run_backtest()
+    
+    performance['params'] = strategy_params
+    return performance
+
+
 def main():
     """
     Main function to run the SMC/ICT bot
@@ -290,7 +526,8 @@ def main():
     # Initialize bot runner
     runner = SMCBotRunner(
         initial_capital=100000,  # $100,000 starting capital
-        commission=0.001         # 0.1% commission
+        commission=0.001,        # 0.1% commission
+        engine='backtrader'      # 'vectorbt' for the one-shot vectorized backtest
     )
     
     # Custom strategy parameters (optional)
@@ -303,11 +540,21 @@ def main():
         'ote_fib_high': 0.79,       # OTE Fibonacci high level
     }
     
-    # Setup Cerebro engine
-    runner.setup_cerebro(strategy_params)
+    # Print the strategy event log (only the Backtrader engine keeps one)
+    if runner.engine == 'backtrader':
+        strategy_params['verbose'] = True
+    
+    # Download 30 days of data in the background while Cerebro is set up
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        prefetch = executor.submit(runner.fetch_real_data, days=30)
+        
+        # Setup Cerebro engine
+        runner.setup_cerebro(strategy_params)
+        
+        prefetched = prefetch.result()
     
-    # Load data (30 days of data)
-    if not runner.load_data(days=30, use_real_data=True):
+    # Load data (falls back to sample data if the download failed)
+    if not runner.load_data(days=30, use_real_data=True, prefetched=prefetched):
         print("Failed to load data. Exiting.")
         return
     
@@ -0,0 +1,310 @@
+"""
+Precomputed signal kernels for the SMC/ICT strategy
+
+The per-bar pattern checks in SMCICTStrategy (swing points, Fair Value Gaps
+and Order Blocks) only depend on the OHLC series, so they can be evaluated
+once over the whole feed and looked up by bar index inside next().
+
+Swing and Order Block detection are plain vectorized NumPy expressions; the
+loop kernels are compiled with Numba when it is installed and fall back to plain Python loops
+otherwise.
+"""
+
+import hashlib
+import warnings
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional
+    def njit(*args, **kwargs):
+        """No-op replacement for numba.njit"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+
+def aligned_empty(n, dtype=np.float64, align=64):
+    """
+    Allocate an uninitialized 1-D array whose data starts on a cache line
+
+    NumPy only guarantees 16-byte alignment, so vector loads in the kernels
+    can straddle two cache lines. Over-allocate raw bytes and slice from the
+    first aligned address instead.
+
+    Args:
+        n (int): Number of elements
+        dtype: NumPy dtype of the elements
+        align (int): Alignment of the first element in bytes
+
+    Returns:
+        np.ndarray: Array of n elements aligned to align bytes
+    """
+    nbytes = n * np.dtype(dtype).itemsize
+    buffer = np.empty(nbytes + align, dtype=np.uint8)
+    offset = -buffer.ctypes.data % align
+    return buffer[offset:offset + nbytes].view(dtype)
+
+
+def as_float_array(values):
+    """
+    Copy a Backtrader line array into a contiguous, cache-line aligned
+    float64 NumPy array
+
+    Args:
+        values: Underlying line storage (e.g. data.lines.high.array)
+
+    Returns:
+        np.ndarray: Contiguous float64 copy of the values
+    """
+    values = np.asarray(values)
+    array = aligned_empty(len(values))
+    array[:] = values
+    return array
+
+
+def detect_swings(highs, lows):
+    """
+    Detect 5-bar fractal swing highs and lows
+
+    A bar is a swing high when its high is strictly above the two highs
+    before and the two highs after it (and vice versa for swing lows).
+    Evaluated in one vectorized pass over 5-bar sliding windows.
+
+    Args:
+        highs (np.ndarray): High prices
+        lows (np.ndarray): Low prices
+
+    Returns:
+        tuple: (swing_high, swing_low) boolean masks indexed by bar
+    """
+    n = highs.shape[0]
+    swing_high = np.zeros(n, dtype=np.bool_)
+    swing_low = np.zeros(n, dtype=np.bool_)
+    if n < 5:
+        return swing_high, swing_low
+
+    # Windows are views (no copy); column 2 is the swing candidate
+    high_windows = sliding_window_view(highs, 5)
+    low_windows = sliding_window_view(lows, 5)
+    neighbours = [0, 1, 3, 4]
+
+    swing_high[2:-2] = (high_windows[:, 2, None] > high_windows[:, neighbours]).all(axis=1)
+    swing_low[2:-2] = (low_windows[:, 2, None] < low_windows[:, neighbours]).all(axis=1)
+
+    return swing_high, swing_low
+
+
+@njit(cache=True)
+def detect_fvgs(highs, lows, min_size):
+    """
+    Detect Fair Value Gaps
+
+    A bullish FVG completes at bar i when low[i] is above high[i-2] by at
+    least min_size points; a bearish FVG when high[i] is below low[i-2].
+
+    Args:
+        highs (np.ndarray): High prices
+        lows (np.ndarray): Low prices
+        min_size (float): Minimum gap size in points
+
+    Returns:
+        tuple: (bullish, bearish) boolean masks indexed by the completing bar
+    """
+    n = highs.shape[0]
+    bullish = np.zeros(n, dtype=np.bool_)
+    bearish = np.zeros(n, dtype=np.bool_)
+
+    for i in range(2, n):
+        if lows[i] > highs[i - 2] and lows[i] - highs[i - 2] >= min_size:
+            bullish[i] = True
+        if highs[i] < lows[i - 2] and lows[i - 2] - highs[i] >= min_size:
+            bearish[i] = True
+
+    return bullish, bearish
+
+
+@njit(cache=True)
+def _next_lower(values):
+    """
+    For every bar, the index of the next bar with a strictly lower value
+
+    Args:
+        values (np.ndarray): Price series
+
+    Returns:
+        np.ndarray: int64 indices, len(values) if there is none
+    """
+    n = values.shape[0]
+    next_lower = np.full(n, n, dtype=np.int64)
+    stack = np.empty(n, dtype=np.int64)
+    top = 0
+
+    for i in range(n):
+        while top > 0 and values[i] < values[stack[top - 1]]:
+            top -= 1
+            next_lower[stack[top]] = i
+        stack[top] = i
+        top += 1
+
+    return next_lower
+
+
+@njit(cache=True)
+def compute_filled_bars(highs, lows, bullish, bearish):
+    """
+    Find the bar at which every Fair Value Gap gets filled
+
+    A bullish FVG completed at bar i is filled by the first later bar whose
+    low reaches its bottom (high[i-2]); a bearish FVG by the first later bar
+    whose high reaches its top (low[i-2]). The forward search jumps along
+    next-lower-low / next-higher-high pointers, so it skips every bar that
+    cannot possibly fill the gap.
+
+    Args:
+        highs (np.ndarray): High prices
+        lows (np.ndarray): Low prices
+        bullish (np.ndarray): Bullish FVG mask from detect_fvgs
+        bearish (np.ndarray): Bearish FVG mask from detect_fvgs
+
+    Returns:
+        tuple: (bullish_filled, bearish_filled) int64 arrays indexed by the
+            completing bar, len(highs) if not filled within the data
+    """
+    n = highs.shape[0]
+    next_lower_low = _next_lower(lows)
+    next_higher_high = _next_lower(-highs)
+    bullish_filled = np.full(n, n, dtype=np.int64)
+    bearish_filled = np.full(n, n, dtype=np.int64)
+
+    for i in range(2, n):
+        if bullish[i]:
+            bottom = highs[i - 2]
+            j = i + 1
+            while j < n and lows[j] > bottom:
+                j = next_lower_low[j]
+            bullish_filled[i] = j
+
+        if bearish[i]:
+            top = lows[i - 2]
+            j = i + 1
+            while j < n and highs[j] < top:
+                j = next_higher_high[j]
+            bearish_filled[i] = j
+
+    return bullish_filled, bearish_filled
+
+
+def detect_obs(opens, closes):
+    """
+    Detect Order Block candles
+    
+    A bullish OB is an up candle followed by a down candle and a lower close;
+    a bearish OB is the mirror image. Both patterns are evaluated for every
+    candle at once with shifted slices. Instead of the raw pattern masks this
+    returns, for every bar, the most recent OB candle at or before it (a
+    running maximum of the matching bar indices), so the strategy finds the
+    latest block with a single lookup.
+    
+    Args:
+        opens (np.ndarray): Open prices
+        closes (np.ndarray): Close prices
+        
+    Returns:
+        tuple: (last_bullish, last_bearish) int64 arrays of bar indices, -1 if none
+    """
+    n = closes.shape[0]
+    last_bullish = np.full(n, -1, dtype=np.int64)
+    last_bearish = np.full(n, -1, dtype=np.int64)
+    if n < 3:
+        return last_bullish, last_bearish
+    
+    # Pattern masks for candles 0 .. n-3 (each needs the two candles after it)
+    up = closes > opens
+    down = closes < opens
+    bullish = up[:-2] & down[1:-1] & (closes[2:] < closes[1:-1])
+    bearish = down[:-2] & up[1:-1] & (closes[2:] > closes[1:-1])
+    
+    candles = np.arange(n - 2)
+    last_bullish[:-2] = np.maximum.accumulate(np.where(bullish, candles, -1))
+    last_bearish[:-2] = np.maximum.accumulate(np.where(bearish, candles, -1))
+    
+    # The last two bars cannot start a pattern yet
+    last_bullish[-2:] = last_bullish[-3]
+    last_bearish[-2:] = last_bearish[-3]
+    
+    return last_bullish, last_bearish
+
+
+@njit(cache=True)
+def compute_atr(highs, lows, closes, period):
+    """
+    Average True Range with Wilder smoothing, matching bt.indicators.ATR
+    
+    The true range starts at the second bar (it needs the previous close);
+    the first ATR value is the simple average of the first ``period`` true
+    ranges and later values are smoothed with alpha = 1 / period.
+    
+    Args:
+        highs (np.ndarray): High prices
+        lows (np.ndarray): Low prices
+        closes (np.ndarray): Close prices
+        period (int): Smoothing period
+        
+    Returns:
+        np.ndarray: ATR values, NaN until the first full period
+    """
+    n = closes.shape[0]
+    atr = np.full(n, np.nan)
+    if n <= period:
+        return atr
+    
+    total = 0.0
+    for i in range(1, n):
+        true_high = max(highs[i], closes[i - 1])
+        true_low = min(lows[i], closes[i - 1])
+        true_range = true_high - true_low
+        if i < period:
+            total += true_range
+        elif i == period:
+            atr[i] = (total + true_range) / period
+        else:
+            atr[i] = atr[i - 1] + (true_range - atr[i - 1]) / period
+    
+    return atr
+
+
+def kernel_source_hash():
+    """
+    Hash of this module's source, embedded in smc_kernels_aot at build time
+
+    Returns:
+        int: First 60 bits of the SHA-256 of smc_kernels.py
+    """
+    with open(__file__, 'rb') as f:
+        return int(hashlib.sha256(f.read()).hexdigest()[:15], 16)
+
+
+# Prefer the ahead-of-time compiled kernels (see build_kernels.py) when they
+# have been built from this exact source: they need no JIT compilation in
+# each new process. A stale build is ignored in favour of the JIT kernels.
+try:
+    import smc_kernels_aot
+except ImportError:
+    smc_kernels_aot = None
+
+if smc_kernels_aot is not None:
+    source_hash = getattr(smc_kernels_aot, 'source_hash', None)
+    if source_hash is not None and source_hash() == kernel_source_hash():
+        detect_fvgs = smc_kernels_aot.detect_fvgs
+        compute_filled_bars = smc_kernels_aot.compute_filled_bars
+        compute_atr = smc_kernels_aot.compute_atr
+    else:
+        warnings.warn("smc_kernels_aot is out of date, using the JIT kernels "
+                      "(rebuild with: python build_kernels.py)", RuntimeWarning)
@@ -0,0 +1,314 @@
+"""
+One-shot signal generation and vectorbt backtests for the SMC/ICT strategy
+
+compute_signals() walks the MarketStructure logic over plain NumPy arrays,
+outside Backtrader's event loop, and returns entry/exit masks and stop
+prices for every bar. run_vectorbt_backtest() feeds those arrays to
+vectorbt's Portfolio.from_signals so the whole backtest is simulated in one
+compiled pass.
+
+The vectorized mode leaves position handling to vectorbt (one position at a
+time, fixed stop and target). The daily trade cap and the breakeven trail
+are only modelled by the Backtrader reference mode (SMCICTStrategy).
+"""
+
+import importlib.util
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from bot import SMCICTStrategy
+from market_structure import MarketStructure
+from smc_kernels import as_float_array, compute_atr
+from zones import BULLISH, BEARISH, SUPPORT, RESISTANCE
+
+
+# Strategy defaults, shared with the Backtrader reference mode
+DEFAULT_PARAMS = dict(SMCICTStrategy.params._getpairs())
+
+ATR_PERIOD = 14
+
+
+class SignalEngine(MarketStructure):
+    """
+    MarketStructure driven directly from a 15-minute OHLC DataFrame
+    """
+    
+    def __init__(self, data_15m, params):
+        """
+        Initialize the engine
+        
+        Args:
+            data_15m (pd.DataFrame): 15-minute OHLC data
+            params (dict): Strategy parameters
+        """
+        self.params = SimpleNamespace(**params)
+        self._O = as_float_array(data_15m['open'].values)
+        self._H = as_float_array(data_15m['high'].values)
+        self._L = as_float_array(data_15m['low'].values)
+        self._C = as_float_array(data_15m['close'].values)
+        self._DT = as_float_array(data_15m.index.asi8)
+        self._bar_i = -1
+        self.init_structure()
+    
+    def log(self, txt, *args, dt=None):
+        """Structure messages are not printed during the signal pass"""
+
+
+def _bias_by_day(data_daily):
+    """Daily bias after each daily bar (1, -1 or 0), see compute_daily_bias"""
+    closes = data_daily['close'].values
+    prev_highs = data_daily['high'].shift(1).values
+    prev_lows = data_daily['low'].shift(1).values
+    signal = np.where(closes > prev_highs, 1.0, np.where(closes < prev_lows, -1.0, np.nan))
+    signal[0] = np.nan  # Needs a previous day
+    return pd.Series(signal).ffill().fillna(0).values.astype(np.int64)
+
+
+def compute_daily_bias(index_15m, data_daily):
+    """
+    Daily bias seen by each 15-minute bar
+    
+    The bias turns bullish when a daily close is above the previous day's high,
+    bearish when it is below the previous day's low, and otherwise keeps its
+    last value. Like the Backtrader feeds, daily bar D is visible from D 00:00.
+    
+    Args:
+        index_15m (pd.DatetimeIndex): 15-minute bar timestamps
+        data_daily (pd.DataFrame): Daily OHLC data, or None
+    
+    Returns:
+        np.ndarray: int64 bias per 15-minute bar (1, -1 or 0)
+    """
+    bias_15m = np.zeros(len(index_15m), dtype=np.int64)
+    if data_daily is None or len(data_daily) < 2:
+        return bias_15m
+    
+    bias = _bias_by_day(data_daily)
+    
+    # Latest daily bar visible at each 15-minute bar
+    day = np.searchsorted(data_daily.index.values, index_15m.values, side='right') - 1
+    visible = day >= 1
+    bias_15m[visible] = bias[day[visible]]
+    return bias_15m
+
+
+def compute_daily_steps(index_15m, data_daily):
+    """
+    Extra strategy steps taken when a daily bar arrives between 15-minute bars
+    
+    Backtrader calls next() once more for each such daily bar, repeating the
+    last 15-minute bar with the new daily bar already visible.
+    
+    Args:
+        index_15m (pd.DatetimeIndex): 15-minute bar timestamps
+        data_daily (pd.DataFrame): Daily OHLC data, or None
+    
+    Returns:
+        dict: 15-minute bar index -> list of the daily bias after each extra
+            step on that bar, in arrival order
+    """
+    steps = {}
+    if data_daily is None or len(data_daily) < 2 or len(index_15m) == 0:
+        return steps
+    
+    bias = _bias_by_day(data_daily)
+    
+    # Daily bars stamped exactly at a 15-minute bar arrive in the same step
+    days = data_daily.index.values
+    bars = np.searchsorted(index_15m.values, days, side='left') - 1
+    arrives_between = (bars >= 0) & ~np.isin(days, index_15m.values)
+    for day in np.flatnonzero(arrives_between):
+        # Like update_daily_bias, the bias needs a previous daily bar
+        steps.setdefault(int(bars[day]), []).append(int(bias[day]) if day >= 1 else 0)
+    return steps
+
+
+def compute_signals(data_15m, data_daily=None, **params):
+    """
+    Compute entry/exit signals for every 15-minute bar in one pass
+    
+    Bars followed by a daily bar are evaluated again with the new bias, as in
+    Backtrader's extra step (see compute_daily_steps). A bar takes at most one
+    entry and keeps any exit raised by either step.
+    
+    Args:
+        data_15m (pd.DataFrame): 15-minute OHLC data
+        data_daily (pd.DataFrame): Daily OHLC data for the bias filter
+        **params: Strategy parameters overriding DEFAULT_PARAMS
+    
+    Returns:
+        dict: NumPy arrays indexed by bar: 'close', 'atr', 'daily_bias',
+            'long_entries', 'short_entries', 'long_exits', 'short_exits'
+            (price inside opposing structure) and 'long_stops', 'short_stops'
+            (stop-loss price on entry bars, NaN elsewhere)
+    """
+    params = dict(DEFAULT_PARAMS, **params)
+    engine = SignalEngine(data_15m, params)
+    engine.precompute_signals()
+    
+    closes = engine._C
+    n = len(closes)
+    atr = compute_atr(engine._H, engine._L, closes, ATR_PERIOD)
+    daily_bias = compute_daily_bias(data_15m.index, data_daily)
+    extra_steps = compute_daily_steps(data_15m.index, data_daily)
+    stop_offset = atr * params['atr_multiplier']
+    
+    long_entries = np.zeros(n, dtype=np.bool_)
+    short_entries = np.zeros(n, dtype=np.bool_)
+    long_exits = np.zeros(n, dtype=np.bool_)
+    short_exits = np.zeros(n, dtype=np.bool_)
+    long_stops = np.full(n, np.nan)
+    short_stops = np.full(n, np.nan)
+    
+    # Start once the ATR is available, like Backtrader's minimum period
+    for bar in range(ATR_PERIOD, n):
+        engine._bar_i = bar
+        price = closes[bar]
+        
+        # The bar's own step, then any extra steps for arriving daily bars
+        # (a bias of 0 on those keeps the previous bias, as in the strategy)
+        bias = daily_bias[bar]
+        for step_bias in [bias] + extra_steps.get(bar, []):
+            bias = step_bias or bias
+            engine.update_structure()
+            
+            long_exits[bar] |= engine.rejecting_structure(price, BEARISH) is not None
+            short_exits[bar] |= engine.rejecting_structure(price, BULLISH) is not None
+            
+            if not engine.swing_highs or not engine.swing_lows:
+                continue
+            if long_entries[bar] or short_entries[bar]:
+                continue  # One entry per bar
+            
+            if bias == 1 and engine.check_long_conditions(price):
+                anchor = engine.swept_liquidity_price(SUPPORT)
+                long_entries[bar] = True
+                long_stops[bar] = (price if anchor is None else anchor) - stop_offset[bar]
+            
+            elif bias == -1 and engine.check_short_conditions(price):
+                anchor = engine.swept_liquidity_price(RESISTANCE)
+                short_entries[bar] = True
+                short_stops[bar] = (price if anchor is None else anchor) + stop_offset[bar]
+    
+    return {
+        'close': closes,
+        'atr': atr,
+        'daily_bias': daily_bias,
+        'long_entries': long_entries,
+        'short_entries': short_entries,
+        'long_exits': long_exits,
+        'short_exits': short_exits,
+        'long_stops': long_stops,
+        'short_stops': short_stops,
+    }
+
+
+def _next_bar(values, fill):
+    """Shift an array one bar forward so signals act on the following bar"""
+    shifted = np.full_like(values, fill)
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+_position_signal_func_nb = None  # Compiled by _load_vectorbt()
+
+
+def _load_vectorbt():
+    """
+    Import vectorbt and compile the signal function on first use
+    
+    vectorbt is optional and takes seconds to import, so the Backtrader mode
+    and modules importing smc_signals never load it.
+    
+    Returns:
+        module: The vectorbt module
+    """
+    global _position_signal_func_nb
+    if importlib.util.find_spec("vectorbt") is None:
+        raise ImportError("vectorbt is required for the vectorized backtest "
+                          "(pip install vectorbt)")
+    
+    import vectorbt as vbt
+    if _position_signal_func_nb is None:
+        from numba import njit
+        from vectorbt.portfolio.nb import get_elem_nb
+        
+        @njit
+        def position_signal_func_nb(c, long_entries, long_exits, short_entries, short_exits):
+            """
+            Signals as SMCICTStrategy acts on them: entries only while flat,
+            and only the exit of the open position's side while in a position
+            
+            Returns:
+                tuple: (long entry, long exit, short entry, short exit) flags
+            """
+            if c.position_now == 0:
+                return (get_elem_nb(c, long_entries), False,
+                        get_elem_nb(c, short_entries), False)
+            if c.position_now > 0:
+                return False, get_elem_nb(c, long_exits), False, False
+            return False, False, False, get_elem_nb(c, short_exits)
+        
+        _position_signal_func_nb = position_signal_func_nb
+    return vbt
+
+
+def run_vectorbt_backtest(data_15m, data_daily=None, initial_capital=100000,
+                          commission=0.001, **params):
+    """
+    Backtest the strategy with vectorbt instead of Backtrader's event loop
+    
+    Entries are sized for a fixed dollar risk and carry a stop at the signal's
+    stop price and a target at target_rr times that risk. As with Backtrader
+    market orders, every signal fills at the next bar's open. Entries are only
+    taken while flat and exits only close their own side, so a bar carrying
+    both an exit and a new entry acts like SMCICTStrategy.next().
+    
+    Args:
+        data_15m (pd.DataFrame): 15-minute OHLC data
+        data_daily (pd.DataFrame): Daily OHLC data for the bias filter
+        initial_capital (float): Starting capital
+        commission (float): Commission rate (0.001 = 0.1%)
+        **params: Strategy parameters overriding DEFAULT_PARAMS
+    
+    Returns:
+        vbt.Portfolio: Simulated portfolio
+    """
+    vbt = _load_vectorbt()
+    
+    params = dict(DEFAULT_PARAMS, **params)
+    signals = compute_signals(data_15m, data_daily, **params)
+    
+    closes = signals['close']
+    stops = np.where(signals['long_entries'], signals['long_stops'], signals['short_stops'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_per_point = np.abs(closes - stops)
+        tradable = risk_per_point > 0
+        size = params['risk_per_trade'] / risk_per_point
+        sl_stop = risk_per_point / closes
+    
+    index = data_15m.index
+    return vbt.Portfolio.from_signals(
+        pd.Series(closes, index=index),
+        signal_func_nb=_position_signal_func_nb,
+        signal_args=(vbt.Rep('long_entries'), vbt.Rep('long_exits'),
+                     vbt.Rep('short_entries'), vbt.Rep('short_exits')),
+        broadcast_named_args=dict(
+            long_entries=_next_bar(signals['long_entries'] & tradable, False),
+            long_exits=_next_bar(signals['long_exits'], False),
+            short_entries=_next_bar(signals['short_entries'] & tradable, False),
+            short_exits=_next_bar(signals['short_exits'], False),
+        ),
+        price=data_15m['open'],
+        open=data_15m['open'],
+        high=data_15m['high'],
+        low=data_15m['low'],
+        size=_next_bar(size, np.nan),
+        sl_stop=_next_bar(sl_stop, np.nan),
+        tp_stop=_next_bar(sl_stop * params['target_rr'], np.nan),
+        fees=commission,
+        init_cash=initial_capital,
+        freq='15min',
+    )
@@ -3,250 +3,284 @@
 Test script for SMC/ICT Trading Bot
 
 This script runs a quick test of the bot with sample data to verify
-all components are working correctly.
+all components are working correctly. The tests are collected by pytest;
+run them with ``python test_bot.py`` or ``python -m pytest test_bot.py``
+(add ``-n auto`` to run them in parallel when pytest-xdist is installed).
 """
 
+import os
 import sys
-import traceback
+import math
+import importlib.util
+from pathlib import Path
 from datetime import datetime
 
+import pytest
+import pandas as pd
+import backtrader as bt
+from bot import SMCICTStrategy
+from data_loader import NAS100DataLoader, TradeLockerDataAdapter
+
+# Committed expected outputs, regenerated with UPDATE_GOLDEN=1
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden"
+
+# Fixed sample data window exported by test_tradelocker_csv_export
+EXPORT_DAYS = 1
+EXPORT_SEED = 42
+EXPORT_END = datetime(2025, 1, 3, 21, 0)  # Friday after the US close (UTC)
+
+# Seeded window in which test_quick_backtest's parameters (the strategy's
+# default filters) close one trade; short windows rarely trade with them
+QUICK_DAYS = 30
+QUICK_SEED = 2
+QUICK_END = datetime(2025, 1, 3, 21, 0)  # Friday after the US close (UTC)
+QUICK_TRADES = 1
+
+# Seeded window for test_vectorbt_parity in which these parameters trade five
+# times, including a re-entry on the bar after a rejection exit
+PARITY_DAYS = 30
+PARITY_SEED = 11
+PARITY_END = datetime(2025, 1, 3, 21, 0)  # Friday after the US close (UTC)
+PARITY_PARAMS = dict(
+    risk_per_trade=100,
+    max_trades_per_day=10,  # High enough that the daily cap never binds
+    liquidity_touches=1,
+    fvg_min_size=1,
+    ote_fib_low=0.3,
+    ote_fib_high=0.9,
+    atr_multiplier=0.5,
+    target_rr=1.5,
+    lookback_period=20,
+)
+
+def _entry_times(transactions):
+    """
+    Fill times of the orders that open a position
+    
+    Args:
+        transactions (dict): Backtrader Transactions analysis
+        
+    Returns:
+        list: pd.Timestamp per position opened
+    """
+    position = 0.0
+    entries = []
+    for dt, fills in transactions.items():
+        for amount, *_ in fills:
+            if abs(position) < 1e-9 and amount:
+                entries.append(pd.Timestamp(dt))
+            position += amount
+    return entries
+
+def _build_cerebro(sample_data, days=5, seed=42, end_date=None, **strategy_kwargs):
+    """
+    Cerebro loaded with the shared sample data and the SMC/ICT strategy
+    
+    Args:
+        sample_data (callable): The sample_data fixture
+        days (int): Sample data window length
+        seed (int): Sample data seed
+        end_date (datetime): Sample data end (default: now)
+        **strategy_kwargs: Strategy parameters
+        
+    Returns:
+        bt.Cerebro: Configured engine, ready to run
+    """
+    cerebro = bt.Cerebro()
+    
+    # Create data feeds from the shared sample data
+    data_15m, data_daily = sample_data(days=days, seed=seed, end_date=end_date)
+    feed_15m, feed_daily = NAS100DataLoader().create_backtrader_feeds(data_15m, data_daily)
+    cerebro.adddata(feed_15m)
+    cerebro.adddata(feed_daily)
+    
+    cerebro.addstrategy(SMCICTStrategy, **strategy_kwargs)
+    return cerebro
+
 def test_imports():
     """Test if all required modules can be imported"""
     print("Testing imports...")
     
-    try:
-        import backtrader as bt
-        print("✅ Backtrader imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import Backtrader: {e}")
-        return False
-    
-    try:
-        import pandas as pd
-        import numpy as np
-        print("✅ Pandas and NumPy imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import Pandas/NumPy: {e}")
-        return False
-    
-    try:
-        from bot import SMCICTStrategy
-        print("✅ SMC/ICT Strategy imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import SMC/ICT Strategy: {e}")
-        return False
-    
-    try:
-        from data_loader import NAS100DataLoader, TradeLockerDataAdapter
-        print("✅ Data loader imported successfully")
-    except ImportError as e:
-        print(f"❌ Failed to import Data loader: {e}")
-        return False
-    
-    return True
-
-def test_data_generation():
+    # find_spec locates the modules without executing them; the exports the
+    # tests use are already imported at module level
+    required = ("backtrader", "pandas", "numpy", "bot", "data_loader")
+    missing = [name for name in required if importlib.util.find_spec(name) is None]
+    assert not missing, f"Failed to find modules: {', '.join(missing)}"
+    
+    print(f"✅ Found {', '.join(required)}")
+
+def test_data_generation(sample_data):
     """Test data generation functionality"""
     print("\nTesting data generation...")
     
-    try:
-        from data_loader import NAS100DataLoader
-        
-        loader = NAS100DataLoader()
-        data_15m, data_daily = loader.generate_sample_data(days=5)
-        
-        if data_15m is None or data_daily is None:
-            print("❌ Data generation returned None")
-            return False
-        
-        if len(data_15m) == 0 or len(data_daily) == 0:
-            print("❌ Generated data is empty")
-            return False
-        
-        print(f"✅ Generated {len(data_15m)} 15-minute bars and {len(data_daily)} daily bars")
-        
-        # Test data format
-        required_columns = ['open', 'high', 'low', 'close', 'volume']
-        for col in required_columns:
-            if col not in data_15m.columns:
-                print(f"❌ Missing column '{col}' in 15-minute data")
-                return False
-            if col not in data_daily.columns:
-                print(f"❌ Missing column '{col}' in daily data")
-                return False
-        
-        print("✅ Data format is correct")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Data generation failed: {e}")
-        traceback.print_exc()
-        return False
+    data_15m, data_daily = sample_data(days=5)
+    
+    assert data_15m is not None and data_daily is not None, "Data generation returned None"
+    assert len(data_15m) > 0 and len(data_daily) > 0, "Generated data is empty"
+    
+    print(f"✅ Generated {len(data_15m)} 15-minute bars and {len(data_daily)} daily bars")
+    
+    # Test data format
+    required_columns = {'open', 'high', 'low', 'close', 'volume'}
+    missing = required_columns - set(data_15m.columns)
+    assert not missing, f"Missing columns {sorted(missing)} in 15-minute data"
+    missing = required_columns - set(data_daily.columns)
+    assert not missing, f"Missing columns {sorted(missing)} in daily data"
+    
+    print("✅ Data format is correct")
 
-def test_strategy_initialization():
+def test_strategy_initialization(sample_data):
     """Test strategy initialization"""
     print("\nTesting strategy initialization...")
     
-    try:
-        import backtrader as bt
-        from bot import SMCICTStrategy
-        from data_loader import NAS100DataLoader
-        
-        # Create minimal cerebro setup
-        cerebro = bt.Cerebro()
-        
-        # Generate sample data
-        loader = NAS100DataLoader()
-        data_15m, data_daily = loader.generate_sample_data(days=5)
-        
-        # Create data feeds
-        feed_15m, feed_daily = loader.create_backtrader_feeds(data_15m, data_daily)
-        
-        # Add data to cerebro
-        cerebro.adddata(feed_15m)
-        cerebro.adddata(feed_daily)
-        
-        # Add strategy
-        cerebro.addstrategy(SMCICTStrategy)
-        
-        print("✅ Strategy initialized successfully")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Strategy initialization failed: {e}")
-        traceback.print_exc()
-        return False
+    # Create minimal cerebro setup
+    _build_cerebro(sample_data)
+    
+    print("✅ Strategy initialized successfully")
 
-def test_quick_backtest():
-    """Run a quick backtest to verify everything works"""
+def test_quick_backtest(sample_data):
+    """Run a quick backtest and check its trades and final value"""
     print("\nTesting quick backtest...")
     
-    try:
-        import backtrader as bt
-        from bot import SMCICTStrategy
-        from data_loader import NAS100DataLoader
-        
-        # Create cerebro
-        cerebro = bt.Cerebro()
-        
-        # Set initial capital
-        cerebro.broker.setcash(10000.0)  # Smaller amount for testing
-        
-        # Generate sample data
-        loader = NAS100DataLoader()
-        data_15m, data_daily = loader.generate_sample_data(days=5)
-        
-        # Create data feeds
-        feed_15m, feed_daily = loader.create_backtrader_feeds(data_15m, data_daily)
-        
-        # Add data to cerebro
-        cerebro.adddata(feed_15m)
-        cerebro.adddata(feed_daily)
-        
-        # Add strategy with test parameters
-        cerebro.addstrategy(
-            SMCICTStrategy,
-            risk_per_trade=100,  # Smaller risk for testing
-            max_trades_per_day=5  # Allow more trades for testing
-        )
-        
-        # Record start values
-        start_value = cerebro.broker.getvalue()
-        
-        # Run backtest
-        print("Running backtest...")
-        results = cerebro.run()
-        
-        # Record end values
-        end_value = cerebro.broker.getvalue()
-        
-        print(f"✅ Backtest completed successfully")
-        print(f"   Start value: ${start_value:,.2f}")
-        print(f"   End value: ${end_value:,.2f}")
-        print(f"   Return: {((end_value - start_value) / start_value * 100):+.2f}%")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ Backtest failed: {e}")
-        traceback.print_exc()
-        return False
+    # Create cerebro with test parameters
+    cerebro = _build_cerebro(
+        sample_data,
+        days=QUICK_DAYS,
+        seed=QUICK_SEED,
+        end_date=QUICK_END,
+        risk_per_trade=100,  # Smaller risk for testing
+        max_trades_per_day=5  # Allow more trades for testing
+    )
+    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+    
+    # Set initial capital (a 100-point risk on NAS100 buys ~50,000 of notional)
+    cerebro.broker.setcash(100000.0)
+    
+    # Record start values
+    start_value = cerebro.broker.getvalue()
+    
+    # Run backtest
+    print("Running backtest...")
+    # runonce/preload (the defaults) keep indicators batched; the default
+    # observers are never inspected, so skip them
+    results = cerebro.run(runonce=True, preload=True, stdstats=False)
+    
+    # Record end values
+    end_value = cerebro.broker.getvalue()
+    
+    assert len(results) == 1, f"Expected one strategy, got {len(results)}"
+    assert math.isfinite(end_value), f"Final value is {end_value}"
+    
+    trades = results[0].analyzers.trades.get_analysis()
+    closed = trades.total.closed if 'total' in trades else 0
+    assert closed == QUICK_TRADES, f"Expected {QUICK_TRADES} closed trades, got {closed}"
+    
+    # Every trade is closed, so the broker value moved by exactly their net PnL
+    assert not results[0].position, "Position still open at the end of the data"
+    assert end_value == pytest.approx(start_value + trades.pnl.net.total), \
+        "Final value does not match the closed trades' net PnL"
+    
+    print(f"✅ Backtest completed successfully")
+    print(f"   Start value: ${start_value:,.2f}")
+    print(f"   End value: ${end_value:,.2f}")
+    print(f"   Return: {((end_value - start_value) / start_value * 100):+.2f}%")
+
+def test_vectorbt_parity(sample_data):
+    """Test the vectorbt engine takes the same trades as the Backtrader engine"""
+    pytest.importorskip("vectorbt")
+    from run_smc_bot import SMCBotRunner
+    print("\nTesting vectorbt parity...")
+    
+    data_15m, data_daily = sample_data(days=PARITY_DAYS, seed=PARITY_SEED, end_date=PARITY_END)
+    
+    runners = {}
+    for engine in ('backtrader', 'vectorbt'):
+        runner = SMCBotRunner(engine=engine)
+        runner.setup_cerebro(PARITY_PARAMS)
+        runner.cerebro.addanalyzer(bt.analyzers.Transactions, _name='transactions')
+        runner.add_data(data_15m, data_daily)
+        runners[engine] = (runner, runner.run_backtest())
+    
+    bt_runner, bt_performance = runners['backtrader']
+    vbt_runner, vbt_performance = runners['vectorbt']
+    
+    bt_entries = _entry_times(bt_runner.results[0].analyzers.transactions.get_analysis())
+    vbt_entries = list(vbt_runner.portfolio.trades.records_readable['Entry Timestamp'])
+    
+    assert bt_performance['total_trades'] > 0, "No trades on the seeded parity data"
+    assert vbt_performance['total_trades'] == bt_performance['total_trades'], "Trade counts differ"
+    assert vbt_entries == bt_entries, "Entry bars differ"
+    
+    print(f"✅ Both engines took {len(bt_entries)} trades on the same bars")
+
+def test_run_backtests_empty_grid(sample_data):
+    """Test an empty parameter sweep returns no results without starting workers"""
+    from run_smc_bot import SMCBotRunner
+    print("\nTesting empty parameter sweep...")
+    
+    runner = SMCBotRunner()
+    runner.data_15m, runner.data_daily = sample_data(days=5)
+    
+    assert runner.run_backtests([]) == [], "Empty sweep returned results"
+    
+    print("✅ Empty parameter sweep returned no results")
 
-def test_tradelocker_compatibility():
+def test_tradelocker_compatibility(sample_data):
     """Test TradeLocker data format compatibility"""
     print("\nTesting TradeLocker compatibility...")
     
-    try:
-        from data_loader import NAS100DataLoader, TradeLockerDataAdapter
-        
-        # Generate sample data
-        loader = NAS100DataLoader()
-        data_15m, data_daily = loader.generate_sample_data(days=2)
-        
-        # Test TradeLocker adapter
-        adapter = TradeLockerDataAdapter()
-        tl_data = adapter.format_for_tradelocker(data_15m, "NAS100")
-        
-        # Check format
-        required_columns = ['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
-        for col in required_columns:
-            if col not in tl_data.columns:
-                print(f"❌ Missing column '{col}' in TradeLocker format")
-                return False
-        
-        # Check symbol column
-        if not all(tl_data['symbol'] == 'NAS100'):
-            print("❌ Symbol column not set correctly")
-            return False
-        
-        print("✅ TradeLocker format is correct")
-        return True
-        
-    except Exception as e:
-        print(f"❌ TradeLocker compatibility test failed: {e}")
-        traceback.print_exc()
-        return False
+    # Get the shared sample data
+    data_15m, data_daily = sample_data(days=5)
+    
+    # Test TradeLocker adapter
+    adapter = TradeLockerDataAdapter()
+    tl_data = adapter.format_for_tradelocker(data_15m, "NAS100")
+    
+    # Check format
+    required_columns = {'symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume'}
+    missing = required_columns - set(tl_data.columns)
+    assert not missing, f"Missing columns {sorted(missing)} in TradeLocker format"
+    
+    # Check symbol column
+    assert (tl_data['symbol'].values == 'NAS100').all(), "Symbol column not set correctly"
+    
+    print("✅ TradeLocker format is correct")
+
+def test_tradelocker_csv_export(sample_data, tmp_path):
+    """Test the TradeLocker CSV export matches the committed golden file byte for byte"""
+    print("\nTesting TradeLocker CSV export...")
+    
+    data_15m, data_daily = sample_data(days=EXPORT_DAYS, seed=EXPORT_SEED, end_date=EXPORT_END)
+    tl_data = TradeLockerDataAdapter.format_for_tradelocker(data_15m, "NAS100")
+    
+    exported = tmp_path / "export.csv"
+    TradeLockerDataAdapter.save_to_csv(tl_data, str(exported))
+    
+    golden = GOLDEN_DIR / "tradelocker_nas100.csv"
+    if os.environ.get("UPDATE_GOLDEN"):
+        GOLDEN_DIR.mkdir(exist_ok=True)
+        golden.write_bytes(exported.read_bytes())
+    
+    # Byte comparison: header quoting, timestamp format and float formatting
+    # (e.g. 15000.0) are all part of the format TradeLocker imports
+    assert exported.read_bytes() == golden.read_bytes(), "CSV export differs from the golden file"
+    
+    print("✅ TradeLocker CSV export is correct")
 
 def main():
-    """Run all tests"""
-    print("SMC/ICT Trading Bot - Test Suite")
-    print("=" * 50)
-    print(f"Test started at: {datetime.now()}")
-    print()
-    
-    tests = [
-        ("Import Test", test_imports),
-        ("Data Generation Test", test_data_generation),
-        ("Strategy Initialization Test", test_strategy_initialization),
-        ("Quick Backtest Test", test_quick_backtest),
-        ("TradeLocker Compatibility Test", test_tradelocker_compatibility),
-    ]
-    
-    passed = 0
-    total = len(tests)
-    
-    for test_name, test_func in tests:
-        print(f"Running {test_name}...")
-        try:
-            if test_func():
-                passed += 1
-            else:
-                print(f"❌ {test_name} FAILED")
-        except Exception as e:
-            print(f"❌ {test_name} FAILED with exception: {e}")
-        
-        print()
+    """
+    Run all tests with pytest
     
-    print("=" * 50)
-    print(f"TEST RESULTS: {passed}/{total} tests passed")
+    Stops at the first failure. The tests run in parallel worker processes
+    when pytest-xdist is installed.
     
-    if passed == total:
-        print("🎉 ALL TESTS PASSED! The bot is ready to use.")
-        return True
-    else:
-        print("⚠️  Some tests failed. Please check the errors above.")
-        return False
+    Returns:
+        int: pytest exit code
+    """
+    args = ["-x", __file__]
+    if importlib.util.find_spec("xdist") is not None:
+        args = ["-n", "auto"] + args
+    return pytest.main(args)
 
 if __name__ == "__main__":
-    success = main()
-    sys.exit(0 if success else 1) 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SMC/ICT structure containers and kernels
+
+Covers the zone containers in zones.py, the Numba/NumPy kernels in
+smc_kernels.py, the liquidity and breaker deduplication in MarketStructure,
+and a golden regression run of the full strategy. The randomized checks
+compare each optimized path against a plain brute-force version.
+
+Regenerate the golden files after an intended behaviour change with
+``UPDATE_GOLDEN=1 python -m pytest test_market_structure.py -k golden``.
+"""
+
+import io
+import os
+import sys
+import contextlib
+from pathlib import Path
+from types import SimpleNamespace
+from datetime import datetime
+
+import pytest
+import numpy as np
+import backtrader as bt
+from bot import SMCICTStrategy
+from data_loader import NAS100DataLoader
+from market_structure import MarketStructure
+from smc_kernels import detect_fvgs, compute_filled_bars, detect_obs
+from zones import ZoneBuffer, RingBuffer, IntervalIndex, BULLISH, BEARISH, SUPPORT, RESISTANCE
+
+# Golden regression run: the test_vectorbt_parity window and parameters,
+# which include entries, stops, targets and rejection exits
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden"
+GOLDEN_DAYS = 30
+GOLDEN_SEED = 11
+GOLDEN_END = datetime(2025, 1, 3, 21, 0)  # Friday after the US close (UTC)
+GOLDEN_PARAMS = dict(
+    risk_per_trade=100,
+    max_trades_per_day=10,
+    liquidity_touches=1,
+    fvg_min_size=1,
+    ote_fib_low=0.3,
+    ote_fib_high=0.9,
+    atr_multiplier=0.5,
+    target_rr=1.5,
+    lookback_period=20,
+)
+
+class _Structure(MarketStructure):
+    """MarketStructure with the strategy defaults and no Backtrader feeds"""
+    
+    def __init__(self, **params):
+        self.params = SimpleNamespace(**dict(SMCICTStrategy.params._getpairs(), **params))
+        self.init_structure()
+    
+    def log(self, txt, *args, dt=None):
+        """Structure messages are not needed by the tests"""
+
+def _random_walk(rng, n):
+    """
+    Random OHLC bars for the brute-force comparisons
+    
+    Returns:
+        tuple: (opens, highs, lows, closes) float64 arrays
+    """
+    closes = 15000 + np.cumsum(rng.normal(0, 5, n))
+    opens = np.roll(closes, 1)
+    opens[0] = closes[0]
+    highs = np.maximum(opens, closes) + rng.uniform(0, 5, n)
+    lows = np.minimum(opens, closes) - rng.uniform(0, 5, n)
+    return opens, highs, lows, closes
+
+# ZoneBuffer
+
+def test_zone_buffer_append_grows():
+    """Test appends past the initial capacity keep every row"""
+    zones = ZoneBuffer(capacity=2, price=np.float64, index=np.int64)
+    for i in range(5):
+        zones.append(price=100.0 + i, index=i)
+    
+    assert len(zones) == 5
+    assert zones.price.tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert zones.index.tolist() == [0, 1, 2, 3, 4]
+
+def test_zone_buffer_views_write_through():
+    """Test writes through the column views update the buffer"""
+    zones = ZoneBuffer(price=np.float64, swept=np.bool_)
+    for price in (1.0, 2.0, 3.0):
+        zones.append(price=price, swept=False)
+    
+    zones.swept[1] = True
+    zones.swept |= zones.price > 2.5
+    
+    assert zones.swept.tolist() == [False, True, True]
+    with pytest.raises(AttributeError):
+        zones.missing
+
+def test_zone_buffer_keep():
+    """Test keep() and keep_last() preserve the order of the kept rows"""
+    zones = ZoneBuffer(price=np.float64)
+    for price in range(6):
+        zones.append(price=float(price))
+    
+    zones.keep(zones.price % 2 == 0)
+    assert zones.price.tolist() == [0.0, 2.0, 4.0]
+    
+    zones.keep(np.ones(len(zones), dtype=bool))
+    assert zones.price.tolist() == [0.0, 2.0, 4.0]
+    
+    zones.keep_last(5)
+    assert zones.price.tolist() == [0.0, 2.0, 4.0]
+    zones.keep_last(2)
+    assert zones.price.tolist() == [2.0, 4.0]
+    
+    # Appends after shrinking reuse the freed rows
+    zones.append(price=6.0)
+    assert zones.price.tolist() == [2.0, 4.0, 6.0]
+
+# RingBuffer
+
+def test_ring_buffer_before_wrap():
+    """Test newest/oldest/recent while the buffer is filling up"""
+    ring = RingBuffer(4, price=np.float64)
+    for price in (10.0, 11.0, 12.0):
+        ring.append(price=price)
+    
+    assert len(ring) == 3
+    assert ring.newest('price') == 12.0
+    assert ring.oldest('price') == 10.0
+    assert ring.recent('price', 2).tolist() == [11.0, 12.0]
+    assert ring.recent('price', 10).tolist() == [10.0, 11.0, 12.0]
+
+def test_ring_buffer_full_at_head_zero():
+    """Test the buffer exactly at capacity, with the write position back at 0"""
+    ring = RingBuffer(3, price=np.float64)
+    for price in (10.0, 11.0, 12.0):
+        ring.append(price=price)
+    
+    assert len(ring) == 3
+    assert ring.newest('price') == 12.0
+    assert ring.oldest('price') == 10.0
+    assert ring.recent('price', 3).tolist() == [10.0, 11.0, 12.0]
+
+def test_ring_buffer_wrap_around():
+    """Test the buffer keeps the newest rows in order once it wraps"""
+    ring = RingBuffer(3, price=np.float64, index=np.int64)
+    for i in range(8):
+        ring.append(price=100.0 + i, index=i)
+        kept = list(range(max(0, i - 2), i + 1))
+        assert len(ring) == len(kept)
+        assert ring.newest('index') == kept[-1]
+        assert ring.oldest('index') == kept[0]
+        assert ring.recent('index', 3).tolist() == kept
+        assert ring.recent('index', 2).tolist() == kept[-2:]
+        assert ring.recent('price', 5).tolist() == [100.0 + k for k in kept]
+        assert sorted(ring.index.tolist()) == kept  # Storage order after wrapping
+
+# IntervalIndex
+
+def test_interval_index_bounds_inclusive():
+    """Test contains() includes both bounds and nothing outside them"""
+    index = IntervalIndex()
+    assert not index.contains(15.0)
+    
+    index.add(10.0, 20.0)
+    assert index.contains(10.0)
+    assert index.contains(20.0)
+    assert index.contains(15.0)
+    assert not index.contains(np.nextafter(10.0, -np.inf))
+    assert not index.contains(np.nextafter(20.0, np.inf))
+
+def test_interval_index_gaps_and_nesting():
+    """Test prices between intervals and inside a wide earlier interval"""
+    index = IntervalIndex(capacity=1)
+    index.add(30.0, 40.0)
+    index.add(0.0, 5.0)
+    index.add(10.0, 11.0)
+    
+    assert len(index) == 3
+    assert not index.contains(7.0)
+    assert not index.contains(20.0)
+    assert index.contains(5.0)
+    assert index.contains(30.0)
+    
+    # A wide interval covers the gaps after the narrow ones sorted above it
+    index.add(1.0, 35.0)
+    assert index.contains(7.0)
+    assert index.contains(20.0)
+    assert not index.contains(40.5)
+    assert not index.contains(-0.5)
+
+def test_interval_index_matches_brute_force():
+    """Test contains() against a linear scan over random intervals"""
+    rng = np.random.default_rng(0)
+    index = IntervalIndex(capacity=2)
+    intervals = []
+    for _ in range(200):
+        bottom = float(rng.integers(0, 1000))
+        top = bottom + float(rng.integers(0, 20))
+        index.add(bottom, top)
+        intervals.append((bottom, top))
+        for price in rng.integers(-5, 1030, 20).astype(float):
+            expected = any(b <= price <= t for b, t in intervals)
+            assert index.contains(price) == expected
+
+# Kernels
+
+def test_compute_filled_bars_boundaries():
+    """Test a gap fills on an exact touch of its far bound and not before"""
+    highs = np.array([100.0, 104.0, 110.0, 108.0, 106.0, 103.0])
+    lows = np.array([95.0, 99.0, 105.0, 102.0, 100.0, 98.0])
+    bullish, bearish = detect_fvgs(highs, lows, 1.0)
+    assert bullish.tolist() == [False, False, True, False, False, False]
+    
+    # Bullish FVG at bar 2 spans 100 - 105: bar 3's low (102) stays above the
+    # bottom, bar 4's low equals it
+    bullish_filled, bearish_filled = compute_filled_bars(highs, lows, bullish, bearish)
+    assert bullish_filled[2] == 4
+    
+    # Never filled within the data
+    lows[4:] = 100.5
+    bullish_filled, _ = compute_filled_bars(highs, lows, bullish, bearish)
+    assert bullish_filled[2] == len(highs)
+
+def test_compute_filled_bars_matches_brute_force():
+    """Test the pointer-jumping search against a forward scan"""
+    rng = np.random.default_rng(1)
+    _, highs, lows, _ = _random_walk(rng, 2000)
+    bullish, bearish = detect_fvgs(highs, lows, 1.0)
+    assert bullish.any() and bearish.any()
+    
+    bullish_filled, bearish_filled = compute_filled_bars(highs, lows, bullish, bearish)
+    n = len(highs)
+    for i in np.flatnonzero(bullish):
+        fills = [j for j in range(i + 1, n) if lows[j] <= highs[i - 2]]
+        assert bullish_filled[i] == (fills[0] if fills else n)
+    for i in np.flatnonzero(bearish):
+        fills = [j for j in range(i + 1, n) if highs[j] >= lows[i - 2]]
+        assert bearish_filled[i] == (fills[0] if fills else n)
+
+def test_detect_obs_short_input():
+    """Test fewer than three bars cannot hold an order block"""
+    last_bullish, last_bearish = detect_obs(np.array([1.0, 2.0]), np.array([2.0, 1.0]))
+    assert last_bullish.tolist() == [-1, -1]
+    assert last_bearish.tolist() == [-1, -1]
+
+def test_detect_obs_matches_brute_force():
+    """Test the latest order block per bar against a loop over the patterns"""
+    rng = np.random.default_rng(2)
+    opens, _, _, closes = _random_walk(rng, 500)
+    last_bullish, last_bearish = detect_obs(opens, closes)
+    
+    up = closes > opens
+    down = closes < opens
+    bullish = [c for c in range(len(closes) - 2)
+               if up[c] and down[c + 1] and closes[c + 2] < closes[c + 1]]
+    bearish = [c for c in range(len(closes) - 2)
+               if down[c] and up[c + 1] and closes[c + 2] > closes[c + 1]]
+    assert bullish and bearish
+    
+    for bar in range(len(closes)):
+        assert last_bullish[bar] == max([c for c in bullish if c <= bar], default=-1)
+        assert last_bearish[bar] == max([c for c in bearish if c <= bar], default=-1)
+
+# Liquidity buckets
+
+def _add_liquidity(structure, prices, zone_type):
+    """
+    Offer every price as a liquidity candidate
+    
+    Args:
+        structure (_Structure): Structure with liquidity_touches=1
+        prices (list): Candidate swing prices
+        zone_type (int): RESISTANCE or SUPPORT
+    """
+    swings = RingBuffer(len(prices) + 1, price=np.float64)
+    for price in prices:
+        swings.append(price=price)
+    swings.append(price=-1e9)  # The newest swing is never a candidate
+    structure._liquidity_candidates[zone_type] = None
+    structure.add_liquidity_zones(swings, zone_type)
+
+def test_liquidity_buckets_dedup_across_bucket_edges():
+    """Test zones within 10 points dedupe even in neighbouring buckets"""
+    structure = _Structure(liquidity_touches=1)
+    
+    _add_liquidity(structure, [1009.0, 1011.0], RESISTANCE)  # Buckets 100 and 101
+    assert structure.liquidity_zones.price.tolist() == [1009.0]
+    
+    _add_liquidity(structure, [999.0], RESISTANCE)  # Exactly 10 points away
+    assert structure.liquidity_zones.price.tolist() == [1009.0]
+    
+    _add_liquidity(structure, [998.9, 1019.5], RESISTANCE)
+    assert structure.liquidity_zones.price.tolist() == [1009.0, 998.9, 1019.5]
+    
+    # Support and resistance are deduplicated separately
+    _add_liquidity(structure, [1009.0], SUPPORT)
+    assert structure.liquidity_zones.type.tolist() == [RESISTANCE] * 3 + [SUPPORT]
+
+def test_liquidity_buckets_removal():
+    """Test a swept zone no longer blocks new zones near its price"""
+    structure = _Structure(liquidity_touches=1)
+    _add_liquidity(structure, [1009.0], SUPPORT)
+    
+    structure.remove_liquidity_bucket(1009.0, SUPPORT)
+    _add_liquidity(structure, [1012.0], SUPPORT)
+    assert structure.liquidity_zones.price.tolist() == [1009.0, 1012.0]
+
+def test_liquidity_buckets_match_brute_force():
+    """Test the bucket lookup against a scan over every stored zone"""
+    rng = np.random.default_rng(3)
+    structure = _Structure(liquidity_touches=1)
+    expected = []
+    for price in np.round(rng.uniform(1000, 1400, 300), 1):
+        if not any(abs(zone - price) <= 10 for zone in expected):
+            expected.append(float(price))
+        _add_liquidity(structure, [float(price)], SUPPORT)
+    
+    assert structure.liquidity_zones.price.tolist() == expected
+
+# Breaker cells
+
+def _invalidate(structure, blocks):
+    """
+    Invalidate order blocks and run the breaker update for them
+    
+    Args:
+        structure (_Structure): Structure to update
+        blocks (list): (type, top, bottom) per invalidated order block
+    """
+    obs = structure.order_blocks
+    start = len(obs)
+    for ob_type, top, bottom in blocks:
+        obs.append(type=ob_type, top=top, bottom=bottom, index=0, invalidated=True)
+    structure._newly_invalidated = np.arange(start, len(obs))
+    structure.update_breaker_blocks()
+
+def test_breaker_cells_five_point_tolerance():
+    """Test breakers within 5 points of both bounds are duplicates"""
+    structure = _Structure()
+    _invalidate(structure, [(BULLISH, 1004.9, 995.1)])  # Cell (200, 199)
+    
+    assert structure.breaker_exists(1009.9, 1000.0)  # Cell (201, 200), 5.0 and 4.9 away
+    assert structure.breaker_exists(999.9, 990.1)
+    assert not structure.breaker_exists(1010.0, 995.1)  # Top 5.1 away
+    assert not structure.breaker_exists(1004.9, 989.9)  # Bottom 5.2 away
+    
+    # Duplicates are not stored; the breaker flips the order block's type
+    _invalidate(structure, [(BEARISH, 1006.0, 996.0), (BEARISH, 1020.0, 1010.0)])
+    assert structure.breaker_blocks.top.tolist() == [1004.9, 1020.0]
+    assert structure.breaker_blocks.type.tolist() == [BEARISH, BULLISH]
+
+def test_breaker_cells_match_brute_force():
+    """Test the 9-cell lookup against a scan over every stored breaker"""
+    rng = np.random.default_rng(4)
+    structure = _Structure()
+    for _ in range(300):
+        bottom = float(np.round(rng.uniform(1000, 1100), 2))
+        top = float(np.round(bottom + rng.uniform(0, 15), 2))
+    
+        expected = any(abs(t - top) <= 5 and abs(b - bottom) <= 5
+                       for t, b in zip(structure.breaker_blocks.top, structure.breaker_blocks.bottom))
+        assert structure.breaker_exists(top, bottom) == expected
+    
+        count = len(structure.breaker_blocks)
+        _invalidate(structure, [(BULLISH, top, bottom)])
+        assert len(structure.breaker_blocks) == count + (not expected)
+
+# Golden regression
+
+def _golden_run(sample_data):
+    """
+    Run the verbose strategy on the golden window
+    
+    Returns:
+        tuple: (event log, trade list) as text
+    """
+    data_15m, data_daily = sample_data(days=GOLDEN_DAYS, seed=GOLDEN_SEED, end_date=GOLDEN_END)
+    
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.broker.setcash(100000.0)
+    cerebro.broker.setcommission(commission=0.001)
+    for feed in NAS100DataLoader().create_backtrader_feeds(data_15m, data_daily):
+        cerebro.adddata(feed)
+    cerebro.addstrategy(SMCICTStrategy, verbose=True, **GOLDEN_PARAMS)
+    cerebro.addanalyzer(bt.analyzers.Transactions, _name='transactions')
+    
+    events = io.StringIO()
+    with contextlib.redirect_stdout(events):
+        results = cerebro.run()
+    
+    trades = ["datetime,amount,price,value"]
+    for dt, fills in results[0].analyzers.transactions.get_analysis().items():
+        for amount, price, _, _, value in fills:
+            trades.append(f"{dt.isoformat()},{amount:.6f},{price:.6f},{value:.6f}")
+    
+    return events.getvalue(), "\n".join(trades) + "\n"
+
+def test_golden_event_log(sample_data):
+    """Test the verbose event log and trade list match the golden run"""
+    events, trades = _golden_run(sample_data)
+    assert "EXECUTED" in events, "No trades in the golden window"
+    
+    golden = {"smc_ict_events.log": events, "smc_ict_trades.csv": trades}
+    if os.environ.get("UPDATE_GOLDEN"):
+        GOLDEN_DIR.mkdir(exist_ok=True)
+        for name, text in golden.items():
+            (GOLDEN_DIR / name).write_text(text)
+    
+    for name, text in golden.items():
+        expected = (GOLDEN_DIR / name).read_text()
+        assert text.splitlines() == expected.splitlines(), f"{name} differs from the golden run"
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(["-x", __file__]))
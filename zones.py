@@ -0,0 +1,239 @@
+"""
+Struct-of-arrays storage for SMC price zones
+
+Fair Value Gaps, Order Blocks, Breaker Blocks and liquidity zones are kept as
+parallel NumPy columns instead of lists of dicts, so the per-bar membership
+and invalidation checks in SMCICTStrategy are single vectorized expressions.
+"""
+
+import numpy as np
+
+
+# Zone type codes
+BULLISH = 1
+BEARISH = -1
+SUPPORT = 1
+RESISTANCE = -1
+
+ZONE_NAMES = {BULLISH: 'bullish', BEARISH: 'bearish'}
+
+# Dtype of the 'type' columns. Bounds stay float64: they are exact bar
+# highs/lows compared against closes, and float32 rounding would flip
+# touches such as a close exactly at a zone bound.
+TYPE_DTYPE = np.int8
+
+
+class ZoneBuffer:
+    """
+    Growable set of parallel NumPy columns
+
+    Columns are exposed as attributes returning views of the live rows, e.g.
+    ``buffer.top``. Writes through those views (or assignments to the
+    attribute) update the buffer in place.
+    """
+
+    def __init__(self, capacity=64, **columns):
+        """
+        Initialize the buffer
+
+        Args:
+            capacity (int): Initial number of rows to allocate
+            **columns: Column name -> NumPy dtype
+        """
+        self._columns = {name: np.empty(max(capacity, 1), dtype=dtype)
+                         for name, dtype in columns.items()}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get('_columns')
+        if columns is None or name not in columns:
+            raise AttributeError(name)
+        return columns[name][:self._size]
+
+    def __setattr__(self, name, value):
+        columns = self.__dict__.get('_columns')
+        if columns is not None and name in columns:
+            # Support in-place updates such as ``buffer.flag |= mask``
+            columns[name][:self._size] = value
+        else:
+            super().__setattr__(name, value)
+
+    def append(self, **values):
+        """
+        Append one row, doubling the allocation when full
+
+        Args:
+            **values: Column name -> value for every column
+        """
+        size = self._size
+        for name, column in self._columns.items():
+            if size == len(column):
+                column = np.concatenate([column, np.empty_like(column)])
+                self._columns[name] = column
+            column[size] = values[name]
+        self._size = size + 1
+
+    def keep(self, mask):
+        """
+        Keep only the rows selected by a boolean mask, preserving order
+
+        Args:
+            mask (np.ndarray): Boolean mask over the live rows
+        """
+        size = int(np.count_nonzero(mask))
+        if size == self._size:
+            return
+        for column in self._columns.values():
+            column[:size] = column[:self._size][mask]
+        self._size = size
+
+    def keep_last(self, count):
+        """
+        Keep only the newest rows
+
+        Args:
+            count (int): Number of rows to keep
+        """
+        if self._size <= count:
+            return
+        start = self._size - count
+        for column in self._columns.values():
+            column[:count] = column[start:self._size]
+        self._size = count
+
+
+class RingBuffer:
+    """
+    Fixed-capacity ring buffer of parallel NumPy columns
+
+    Keeps the newest ``capacity`` rows, like ``deque(maxlen=capacity)``.
+    Column attributes return the live rows in storage order, which is only
+    chronological until the buffer wraps; use recent() for ordered values.
+    """
+
+    def __init__(self, capacity, **columns):
+        """
+        Initialize the buffer
+
+        Args:
+            capacity (int): Maximum number of rows kept
+            **columns: Column name -> NumPy dtype
+        """
+        self._capacity = capacity
+        self._columns = {name: np.empty(capacity, dtype=dtype)
+                         for name, dtype in columns.items()}
+        self._head = 0  # Next write position
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get('_columns')
+        if columns is None or name not in columns:
+            raise AttributeError(name)
+        return columns[name][:self._size]
+
+    def append(self, **values):
+        """
+        Append one row, overwriting the oldest row when full
+
+        Args:
+            **values: Column name -> value for every column
+        """
+        head = self._head
+        for name, column in self._columns.items():
+            column[head] = values[name]
+        self._head = (head + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+
+    def newest(self, name):
+        """Return the most recently appended value of a column"""
+        return self._columns[name][(self._head - 1) % self._capacity]
+
+    def oldest(self, name):
+        """Return the oldest retained value of a column"""
+        return self._columns[name][(self._head - self._size) % self._capacity]
+
+    def recent(self, name, count):
+        """
+        Return the newest values of a column in chronological order
+
+        Args:
+            name (str): Column name
+            count (int): Maximum number of values to return
+
+        Returns:
+            np.ndarray: Up to count values, oldest first
+        """
+        count = min(count, self._size)
+        positions = np.arange(self._head - count, self._head) % self._capacity
+        return self._columns[name][positions]
+
+
+class IntervalIndex:
+    """
+    Append-only set of [bottom, top] intervals with O(log n) containment
+    
+    Intervals are kept sorted by bottom alongside a running maximum of their
+    tops, so "does any interval contain price" is one binary search for the
+    intervals with bottom <= price plus one lookup of their highest top.
+    """
+    
+    def __init__(self, capacity=64):
+        """
+        Initialize the index
+        
+        Args:
+            capacity (int): Initial number of intervals to allocate
+        """
+        self._bottoms = np.empty(max(capacity, 1))
+        self._tops = np.empty(max(capacity, 1))
+        self._max_tops = np.empty(max(capacity, 1))  # Running max of tops by bottom order
+        self._size = 0
+    
+    def __len__(self):
+        return self._size
+    
+    def add(self, bottom, top):
+        """
+        Insert an interval, keeping the bottoms sorted
+        
+        Args:
+            bottom (float): Lower bound
+            top (float): Upper bound
+        """
+        size = self._size
+        if size == len(self._bottoms):
+            self._bottoms = np.concatenate([self._bottoms, np.empty_like(self._bottoms)])
+            self._tops = np.concatenate([self._tops, np.empty_like(self._tops)])
+            self._max_tops = np.concatenate([self._max_tops, np.empty_like(self._max_tops)])
+        
+        i = int(np.searchsorted(self._bottoms[:size], bottom, side='right'))
+        self._bottoms[i + 1:size + 1] = self._bottoms[i:size]
+        self._tops[i + 1:size + 1] = self._tops[i:size]
+        self._bottoms[i] = bottom
+        self._tops[i] = top
+        self._size = size + 1
+        
+        # Only the running maximum from the insertion point onwards changes
+        tops = self._tops[i:size + 1].copy()
+        if i > 0:
+            tops[0] = max(tops[0], self._max_tops[i - 1])
+        self._max_tops[i:size + 1] = np.maximum.accumulate(tops)
+    
+    def contains(self, price):
+        """
+        Check whether any interval contains price (bounds inclusive)
+        
+        Args:
+            price (float): Price to test
+            
+        Returns:
+            bool: True if bottom <= price <= top for some interval
+        """
+        i = np.searchsorted(self._bottoms[:self._size], price, side='right')
+        return i > 0 and self._max_tops[i - 1] >= price